@@ -44,3 +44,11 @@ _health_review_config_path = (
     Path(__file__).parent.resolve() / "config/chps_review_conversion.yaml"
 )
 health_review_config = get_yaml_config(_health_review_config_path)
+
+# Registry of the CHPS tables
+_chps_tables_config_path = Path(__file__).parent.resolve() / "config/chps_tables.yaml"
+chps_tables_config = get_yaml_config(_chps_tables_config_path)
+
+# Cohorts of FRS households
+_cohorts_config_path = Path(__file__).parent.resolve() / "config/cohorts.yaml"
+cohorts_config = get_yaml_config(_cohorts_config_path)
@@ -0,0 +1,41 @@
+"""
+Checks the household aggregation helpers against a groupby, including the rows whose
+household is missing or not one of the households, and unsorted households.
+
+No data is downloaded.
+
+Usage:
+python -m afs_mission_goal.analysis.check_household_aggregation
+"""
+
+import numpy as np
+import pandas as pd
+
+from afs_mission_goal.utils.household_aggregation import (
+    count_by_household,
+    household_codes,
+    household_index,
+)
+
+if __name__ == "__main__":
+    households = household_index(pd.Series([3, 1, 2, 5]))
+    assert households.tolist() == [1, 2, 3, 5]
+
+    # 4 lies between two households and 9 after the last one, neither is a household
+    people = pd.Series([1, 2, 2, 4, 5, np.nan, 9, 3])
+    codes = household_codes(households, people)
+    assert codes.tolist() == [0, 1, 1, -1, 3, -1, -1, 2]
+    counts = count_by_household(codes, len(households))
+    expected = people.value_counts().reindex(households, fill_value=0)
+    assert counts.tolist() == expected.tolist()
+    print("Rows outside the households are not counted")
+
+    try:
+        household_codes(pd.Index([3, 1, 2], name="sernum"), people)
+    except ValueError:
+        print("Unsorted households are rejected")
+    else:
+        raise AssertionError("Unsorted households were accepted")
+
+    assert household_codes(pd.Index([], name="sernum"), people).tolist() == [-1] * 8
+    print("No households gives no codes")
@@ -0,0 +1,84 @@
+"""
+Checks `weighted_estimates` against a brute-force groupby of the same statistics.
+
+The inputs are synthetic households with missing values, missing weights and a
+categorical grouping column with an unused category, as the FRS labelled columns
+are categoricals. No data is downloaded.
+
+Usage:
+python -m afs_mission_goal.analysis.check_weighted_estimates
+"""
+
+import numpy as np
+import pandas as pd
+
+from afs_mission_goal.utils.weighted_estimates import weighted_estimates
+
+PROBABILITIES = [0.1, 0.5, 0.9]
+
+
+def make_households(rows: int = 5_000, seed: int = 0) -> pd.DataFrame:
+    """Random households with a numeric and a categorical grouping column."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "sernum": np.arange(rows),
+            "num_adults": rng.integers(1, 4, rows).astype("float64"),
+            # "owned" is never used, so it has no group
+            "tenure": pd.Categorical(
+                rng.choice(["rented", "social"], rows),
+                categories=["owned", "rented", "social"],
+            ),
+            "income": rng.normal(500, 150, rows),
+            "lowincome": rng.random(rows) < 0.3,
+            "weight": rng.uniform(500, 3000, rows),
+        }
+    )
+    df.loc[::37, "income"] = np.nan
+    df.loc[::101, "num_adults"] = np.nan
+    df.loc[::53, "weight"] = np.nan
+    return df
+
+
+def brute_force_estimates(df: pd.DataFrame, by: list) -> pd.DataFrame:
+    """The estimates of `weighted_estimates`, with a groupby and a loop over the groups."""
+    rows = {}
+    df = df.dropna(subset=by + ["weight"])
+    for group, sub in df.groupby(by, observed=True):
+        with_income = sub.dropna(subset=["income"]).sort_values("income")
+        cumulative = with_income.weight.cumsum()
+        rows[group if len(by) > 1 else group[0]] = {
+            "weighted_count": sub.weight.sum(),
+            "unweighted_count": len(sub),
+            "total_income": (with_income.income * with_income.weight).sum(),
+            "mean_income": np.average(with_income.income, weights=with_income.weight),
+            "proportion_lowincome": np.average(sub.lowincome, weights=sub.weight),
+            **{
+                f"q{q}_income": with_income.income[
+                    cumulative >= q * with_income.weight.sum()
+                ].iloc[0]
+                for q in PROBABILITIES
+            },
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+if __name__ == "__main__":
+    df = make_households()
+    for by in [["num_adults"], ["tenure"], ["tenure", "num_adults"]]:
+        estimates = weighted_estimates(
+            df,
+            "weight",
+            by=by,
+            totals=["income"],
+            means=["income"],
+            proportions=["lowincome"],
+            quantiles={"income": PROBABILITIES},
+        )
+        expected = brute_force_estimates(df, by)
+        assert estimates.index.to_flat_index().tolist() == expected.index.tolist()
+        np.testing.assert_allclose(
+            estimates.to_numpy(dtype="float64"),
+            expected[estimates.columns].to_numpy(dtype="float64"),
+        )
+        print(f"Estimates by {by} match")
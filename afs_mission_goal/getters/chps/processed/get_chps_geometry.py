@@ -0,0 +1,50 @@
+import geopandas as gpd
+from afs_mission_goal.pipeline.cleaning_functions_chps import suppression_view
+from afs_mission_goal.getters.chps.processed.get_chps_table import get_chps_table
+from afs_mission_goal.utils.chps_registry import Years
+from afs_mission_goal.utils.s3_cache import fetch_object, get_cache_settings
+from afs_mission_goal import S3_BUCKET, config
+
+# The boundaries, once loaded
+_council_area_geometry = {}
+
+
+def get_council_area_geometry() -> gpd.GeoDataFrame:
+    """Retrieve the simplified boundaries of the Scottish council areas, built by
+    `afs_mission_goal/pipeline/build_council_area_geometry.py`.
+    The GeoParquet is read through the local S3 cache and only parsed once per session.
+
+    Returns:
+        gpd.GeoDataFrame: One row per council area, with its `local_authority_code` and boundary in WGS84.
+    """
+    if "gdf" not in _council_area_geometry:
+        local_path = fetch_object(S3_BUCKET, config["council_area_geometry"]["path"])
+        try:
+            _council_area_geometry["gdf"] = gpd.read_parquet(local_path)
+        finally:
+            if get_cache_settings()["mode"] == "off":
+                local_path.unlink(missing_ok=True)
+    return _council_area_geometry["gdf"].copy()
+
+
+def get_chps_by_local_authority(
+    table: str = "simd_la_developmental_breakdown",
+    year: Years = None,
+    keep_suppression: bool = False,
+) -> gpd.GeoDataFrame:
+    """Retrieve a CHPS table by local authority joined to the boundaries of the council areas, ready to map.
+
+    Args:
+        table (str): Name of the processed table with a `local_authority_code` column.
+            Defaults to "simd_la_developmental_breakdown".
+        year (Union[int, Iterable[int]], optional): A publication year or several (see `get_chps_table`).
+            Defaults to the latest year.
+        keep_suppression (bool): If True, the suppressed values are shown as "<5" for display,
+            if False, they are converted to 5. Defaults to False.
+
+    Returns:
+        gpd.GeoDataFrame: The rows of the table with the boundary of their council area.
+    """
+    df = get_chps_table(table, year)
+    df = suppression_view(df, keep_suppression=keep_suppression)
+    return get_council_area_geometry().merge(df, on="local_authority_code")
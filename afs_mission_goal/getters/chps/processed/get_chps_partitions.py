@@ -0,0 +1,35 @@
+import pandas as pd
+from functools import partial
+from afs_mission_goal.utils.bulk_load import load_concurrently, raise_for_errors
+from afs_mission_goal.utils.chps_registry import (
+    Years,
+    partition_key,
+    resolve_chps_years,
+)
+from afs_mission_goal.utils.parquet_storage import read_processed_table
+from afs_mission_goal import S3_BUCKET
+
+
+def get_chps_partitions(table: str, year: Years = None) -> pd.DataFrame:
+    """Retrieve one or more years of a clean and processed CHPS table from the year-partitioned dataset.
+    Only the partitions of the requested years are downloaded, concurrently.
+
+    Args:
+        table (str): Name of the processed table, e.g. "simd_sex_developmental_breakdown" or "sex_counts_of_concerns".
+        year (Union[int, Iterable[int]], optional): A publication year (e.g. 2024) or several (e.g. range(2022, 2025)).
+            Defaults to the latest year.
+
+    Returns:
+        pd.DataFrame: The table for every requested year, with the year in the `publication_year` column.
+    """
+    partitions, errors = load_concurrently(
+        {
+            year: partial(read_processed_table, S3_BUCKET, partition_key(table, year))
+            for year in resolve_chps_years(year)
+        }
+    )
+    raise_for_errors(errors, f"{table} partition")
+    df = pd.concat(partitions.values(), ignore_index=True)
+    # Text columns are stored as categoricals, return them as text like the CSV tables
+    categorical_columns = df.columns[df.dtypes == "category"]
+    return df.astype({col: "object" for col in categorical_columns})
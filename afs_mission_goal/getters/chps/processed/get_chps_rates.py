@@ -0,0 +1,28 @@
+import pandas as pd
+from typing import Optional
+from afs_mission_goal.utils.parquet_storage import Filters, read_processed_table
+from afs_mission_goal import S3_BUCKET, chps_tables_config
+
+
+def get_chps_rates(
+    table: Optional[str] = None, filters: Optional[Filters] = None
+) -> pd.DataFrame:
+    """Retrieve the precomputed rates and Wilson confidence intervals of the CHPS counts.
+    The rates are computed by `afs_mission_goal/pipeline/compute_chps_rates.py`, so this is only a lookup.
+
+    Args:
+        table (str, optional): Only load the rates of this processed table, e.g. "simd_sex_developmental_breakdown".
+            Defaults to every table.
+        filters (Filters, optional): Only load the rows matching these filters, in the pyarrow format,
+            e.g. `[("review_period", "==", "27-30 months"), ("simd_quintile", "in", ["1", "5"])]`.
+
+    Returns:
+        pd.DataFrame: The rates, one row per table, publication year, review period, SIMD quintile,
+            local authority, breakdown and count (the `measure`), with the `rate`, `ci_lower` and `ci_upper`.
+    """
+    filters = list(filters or [])
+    if table is not None:
+        filters.append(("table", "==", table))
+    return read_processed_table(
+        S3_BUCKET, chps_tables_config["rates_key"], filters=filters or None
+    )
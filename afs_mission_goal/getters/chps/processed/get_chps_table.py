@@ -0,0 +1,37 @@
+import pandas as pd
+from afs_mission_goal.getters.chps.processed.get_chps_partitions import (
+    get_chps_partitions,
+)
+from afs_mission_goal.utils.suppression import SUPPRESSED_SUFFIX, split_suppressed
+from afs_mission_goal.utils.chps_registry import Years
+from afs_mission_goal.utils.parquet_storage import read_processed_table
+from afs_mission_goal import S3_BUCKET, chps_tables_config
+
+
+def get_chps_table(table: str, year: Years = None) -> pd.DataFrame:
+    """Retrieve a clean and processed CHPS table with typed counts.
+    Each count column is a nullable integer column, followed by a boolean `<column>_suppressed` column
+    marking the values suppressed for disclosure control, which are missing in the count column.
+
+    Args:
+        table (str): Name of the processed table, e.g. "simd_sex_developmental_breakdown" or "sex_counts_of_concerns".
+        year (Union[int, Iterable[int]], optional): A publication year or several. If given, the years are read
+            from the year-partitioned dataset and stacked, with the year in a `publication_year` column.
+            Defaults to the processed table of the latest year.
+
+    Returns:
+        pd.DataFrame: The table with typed counts and suppression masks.
+    """
+    if year is not None:
+        df = get_chps_partitions(table, year)
+    else:
+        df = read_processed_table(
+            S3_BUCKET, f"{chps_tables_config['processed_prefix']}{table}.csv"
+        )
+        # Text columns are stored as categoricals, return them as text like the partitions
+        categorical_columns = df.columns[df.dtypes == "category"]
+        df = df.astype({col: "object" for col in categorical_columns})
+    if not df.columns.str.endswith(SUPPRESSED_SUFFIX).any():
+        # Tables saved before the counts were typed in the pipeline
+        df = split_suppressed(df)
+    return df
@@ -1,15 +1,25 @@
 import pandas as pd
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from afs_mission_goal.utils.s3_cache import cached_download_obj
+from afs_mission_goal.getters.chps.processed.get_chps_partitions import (
+    get_chps_partitions,
+)
+from afs_mission_goal.utils.chps_registry import Years
 from afs_mission_goal import S3_BUCKET
 
 
-def get_clean_chps_lookup() -> pd.DataFrame:
+def get_clean_chps_lookup(year: Years = None) -> pd.DataFrame:
     """Retrieve the clean and processed data for the CHPS lookup data.
 
+    Args:
+        year (Union[int, Iterable[int]], optional): A publication year or several. If given, the years are read
+            from the year-partitioned dataset and stacked. Defaults to the CSV of the latest year.
+
     Returns:
         pd.DataFrame: Returns a dataframe of the clean and processed data for the CHPS lookup data.
     """
-    return download_obj(
+    if year is not None:
+        return get_chps_partitions("chps_lookup", year)
+    return cached_download_obj(
         S3_BUCKET,
         "scotland/data/chps_aggregated/processed/chps_lookup.csv",
         download_as="dataframe",
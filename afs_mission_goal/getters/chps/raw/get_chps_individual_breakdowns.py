@@ -1,30 +1,38 @@
 import pandas as pd
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from typing import Optional
+from afs_mission_goal.utils.s3_cache import cached_download_obj
+from afs_mission_goal.utils.chps_registry import raw_key
 from afs_mission_goal import S3_BUCKET
 
 
-def get_chps_data_ethnicity() -> pd.DataFrame:
+def get_chps_data_ethnicity(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by ethnicity.Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed developmental concerns broken down by ethnicity.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t4_eth.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t4_eth", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_lac() -> pd.DataFrame:
+def get_chps_data_lac(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by LAC (Looked After Children). Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed developmental concerns broken down by LAC.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t6_lac.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t6_lac", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_eng() -> pd.DataFrame:
+def get_chps_data_eng(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by English as a first language. Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed developmental concerns broken down by English as a first language.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t8_eal.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t8_eal", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
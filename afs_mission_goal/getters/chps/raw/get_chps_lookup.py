@@ -1,12 +1,16 @@
 import pandas as pd
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from typing import Optional
+from afs_mission_goal.utils.s3_cache import cached_download_obj
+from afs_mission_goal.utils.chps_registry import raw_key
 from afs_mission_goal import S3_BUCKET
 
 
-def get_chps_lookup() -> pd.DataFrame:
+def get_chps_lookup(year: Optional[int] = None) -> pd.DataFrame:
     """Get the CHPS lookup data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed CHPS lookup data
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_lookups.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("lookup", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
@@ -1,75 +1,95 @@
 import pandas as pd
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from typing import Optional
+from afs_mission_goal.utils.s3_cache import cached_download_obj
+from afs_mission_goal.utils.chps_registry import raw_key
 from afs_mission_goal import S3_BUCKET
 
 
-def get_chps_data_la_simd() -> pd.DataFrame:
+def get_chps_data_la_simd(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by LA and SIMD (Scottish Indices of Multiple Deprivation) data. Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed data of the developmental concerns broken down by LA and SIMD.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t1_la_simd.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t1_la_simd", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_simd_sex() -> pd.DataFrame:
+def get_chps_data_simd_sex(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by SIMD and sex data. Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed data of the developmental concerns broken down by SIMD and sex.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t2_simd_sex.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t2_simd_sex", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_simd_ethnicity() -> pd.DataFrame:
+def get_chps_data_simd_ethnicity(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by SIMD and ethnicity. Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed data of the developmental concerns broken down by SIMD and ethnicity.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t3_simd_eth.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t3_simd_eth", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_simd_lac() -> pd.DataFrame:
+def get_chps_data_simd_lac(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by SIMD and LAC (Looked After Children). Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed data of the developmental concerns broken down by SIMD and LAC.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t5_simd_lac.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t5_simd_lac", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_simd_eng() -> pd.DataFrame:
+def get_chps_data_simd_eng(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by SIMD and English as a first language. Data is from the CHPS data.a.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed data of the developmental concerns broken down by SIMD and English as a first language.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t7_simd_eal.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t7_simd_eal", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_simd_primary_carer_smoking() -> pd.DataFrame:
+def get_chps_data_simd_primary_carer_smoking(
+    year: Optional[int] = None,
+) -> pd.DataFrame:
     """Get the development concerns breakdown by SIMD and exposure to primary carer smoke. Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed data of the developmental concerns breakdown by SIMD and exposure to primary carer smoke.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t9_simd_smok1.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t9_simd_smok1", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_simd_secondhand_smoke() -> pd.DataFrame:
+def get_chps_data_simd_secondhand_smoke(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by SIMD and exposure to second hand smoke. Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed data of the developmental concerns breakdown by SIMD and exposure to second hand smoke
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t10_simd_smok2.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t10_simd_smok2", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
 
 
-def get_chps_data_simd_childcare() -> pd.DataFrame:
+def get_chps_data_simd_childcare(year: Optional[int] = None) -> pd.DataFrame:
     """Get the development concerns breakdown by SIMD and childcare attendance. Data is from the CHPS data.
+    Args:
+        year (int, optional): The publication year. Defaults to the latest year.
     Returns:
         pd.DataFrame: A dataframe of the raw, unprocessed of the developmental concerns broken down by childcare attendance and SIMD.
     """
-    path = "scotland/data/chps_aggregated/raw/chps_data_2024_t11_simd_childcare.csv"
-    return download_obj(S3_BUCKET, path, download_as="dataframe")
+    path = raw_key("t11_simd_childcare", year)
+    return cached_download_obj(S3_BUCKET, path, download_as="dataframe")
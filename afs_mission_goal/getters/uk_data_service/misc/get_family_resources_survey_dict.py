@@ -1,4 +1,4 @@
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from afs_mission_goal.utils.s3_cache import cached_download_obj
 from afs_mission_goal import DS_BUCKET
 
 
@@ -8,4 +8,4 @@ def get_family_resources_survey_dict() -> dict:
         dict: Family resources survey column dictionary.
     """
     path = "data/aux/frs.json"
-    return download_obj(DS_BUCKET, path_from=path, download_as="dict")
+    return cached_download_obj(DS_BUCKET, path_from=path, download_as="dict")
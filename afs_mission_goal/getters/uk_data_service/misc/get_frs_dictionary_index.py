@@ -0,0 +1,70 @@
+import json
+import pandas as pd
+from functools import lru_cache
+from typing import Dict, List, Optional
+from afs_mission_goal.utils.parquet_storage import read_processed_table
+from afs_mission_goal import DS_BUCKET, config
+
+# Version of the layout of the index, part of its path so an older index is never read
+FRS_DICTIONARY_INDEX_VERSION = 1
+
+
+def frs_dictionary_index_path() -> str:
+    """S3 key of the index of the FRS variables built by `afs_mission_goal/pipeline/build_frs_dictionary_index.py`."""
+    return config["frs_dictionary_index"]["path"].format(
+        version=FRS_DICTIONARY_INDEX_VERSION
+    )
+
+
+def get_frs_dictionary_index(columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Function to load the index of the Family Resources Survey variables.
+    Args:
+        columns (List[str], optional): Only load these columns of the index. Defaults to every column.
+    Returns:
+        pd.DataFrame: The index, one row per variable and dataset (see `build_frs_dictionary_index`).
+    """
+    index = read_processed_table(
+        DS_BUCKET, frs_dictionary_index_path(), columns=columns
+    )
+    # Text columns are stored as categoricals, return them as text for the lookups
+    categorical_columns = index.columns[index.dtypes == "category"]
+    return index.astype({col: "object" for col in categorical_columns})
+
+
+@lru_cache(maxsize=None)
+def get_frs_clean_labels() -> Dict[str, str]:
+    """Function to load the cleaned labels of the FRS variables, the names of the columns of the filtered dataframes.
+    The index is only loaded the first time.
+    Returns:
+        Dict[str, str]: The cleaned label of each variable, keyed by the upper case variable name.
+    """
+    index = get_frs_dictionary_index(["variable", "clean_label"]).dropna()
+    return dict(zip(index.variable, index.clean_label))
+
+
+@lru_cache(maxsize=None)
+def get_frs_readable_names() -> Dict[str, str]:
+    """Function to load the readable names of the FRS columns, as in `frs.json`.
+    The index is only loaded the first time.
+    Returns:
+        Dict[str, str]: The readable name of each column, keyed by the column name.
+    """
+    index = get_frs_dictionary_index(["name", "readable_name"]).dropna()
+    index = index.drop_duplicates(subset="name")
+    return dict(zip(index.name, index.readable_name))
+
+
+@lru_cache(maxsize=None)
+def get_frs_value_labels() -> Dict[str, Dict[str, dict]]:
+    """Function to load the labels of the values of the FRS variables, as in the `*_variables.json` files.
+    The index is only loaded the first time.
+    Returns:
+        Dict[str, Dict[str, dict]]: The labels of the values of each variable (upper case), for each dataset.
+    """
+    index = get_frs_dictionary_index(["variable", "dataset", "value_labels"]).dropna()
+    value_labels = {}
+    for variable, dataset, labels in index[
+        ["variable", "dataset", "value_labels"]
+    ].itertuples(index=False):
+        value_labels.setdefault(dataset, {})[variable] = json.loads(labels)
+    return value_labels
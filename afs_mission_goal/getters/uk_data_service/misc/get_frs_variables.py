@@ -1,4 +1,4 @@
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from afs_mission_goal.utils.s3_cache import cached_download_obj
 from afs_mission_goal import DS_BUCKET, config
 
 
@@ -11,7 +11,7 @@ def get_frs_variables_dict() -> dict:
     for variables, name in zip(config["frs_original_names"], config["frs_datasets"]):
         path = f"data/aux/frs_variables/{variables}_variables.json"
         try:
-            dictionary_of_datasets[name] = download_obj(
+            dictionary_of_datasets[name] = cached_download_obj(
                 DS_BUCKET, path_from=path, download_as="dict"
             )
         except:
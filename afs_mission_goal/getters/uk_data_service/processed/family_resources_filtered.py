@@ -1,28 +1,53 @@
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from afs_mission_goal.utils.parquet_storage import read_processed_table
+from afs_mission_goal.utils.bulk_load import (
+    load_concurrently,
+    raise_for_errors,
+    split_missing,
+)
+from functools import partial
+import logging
+import numpy as np
 import pandas as pd
+from typing import Optional
 from afs_mission_goal import config, DS_BUCKET
 
+logger = logging.getLogger(__name__)
 
-def get_filtered_datasets() -> dict:
+
+def _load_filtered_datasets(directory: str, max_workers: Optional[int]) -> dict:
+    """
+    Load the filtered datasets saved in a directory concurrently. Datasets with no variables of interest have no file and are skipped.
+    Args:
+        directory (str): S3 directory of the filtered datasets.
+        max_workers (int, optional): Number of datasets downloaded at the same time.
+    Returns:
+        dict: Dictionary of the datasets (in the format of dataframes) that exist in the directory.
+    """
+    loaders = {
+        dataset: partial(
+            read_processed_table, DS_BUCKET, f"{directory}/{dataset}_df.csv"
+        )
+        for dataset in config["frs_datasets"]
+    }
+    dictionary_of_datasets, errors = load_concurrently(loaders, max_workers=max_workers)
+    missing, errors = split_missing(errors)
+    for dataset in missing:
+        logger.info(f"Dataset {dataset} not found in variables of interest.")
+    raise_for_errors(errors, "filtered FRS dataset")
+    return dictionary_of_datasets
+
+
+def get_filtered_datasets(max_workers: Optional[int] = None) -> dict:
     """
     Function to load all datasets from the Family Resources Survey from the UK Data Service.
+    Args:
+        max_workers (int, optional): Number of datasets downloaded at the same time. Defaults to the config value.
     Returns:
         dict: Dictionary of all datasets (in the format of dataframes) from the Family Resources Survey.
     """
-    frs_datasets = config["frs_datasets"]
-    dictionary_of_datasets = {}
-    for dataset in frs_datasets:
-        try:
-            path = f"data/processed/filtered_dataframes/{dataset}_df.csv"
-            dictionary_of_datasets[dataset] = download_obj(
-                DS_BUCKET,
-                path_from=path,
-                download_as="dataframe",
-            )
-        except:
-            print(f"Dataset {dataset} not found in variables of interest.")
-            continue
-    return dictionary_of_datasets
+    return _load_filtered_datasets(
+        "data/processed/filtered_dataframes", max_workers=max_workers
+    )
 
 
 def get_base_df() -> pd.DataFrame:
@@ -32,7 +57,7 @@ def get_base_df() -> pd.DataFrame:
         pd.DataFrame: Base dataframe with the child and adult data.
     """
     path = "data/processed/filtered_dataframes/base_df.csv"
-    return download_obj(DS_BUCKET, path_from=path, download_as="dataframe")
+    return read_processed_table(DS_BUCKET, path)
 
 
 def get_lowincome_0_5() -> pd.DataFrame:
@@ -42,26 +67,71 @@ def get_lowincome_0_5() -> pd.DataFrame:
         pd.DataFrame: Low income households with children under 5 dataframe.
     """
     path = "data/processed/filtered_dataframes/lowincome_0_5.csv"
-    return download_obj(DS_BUCKET, path_from=path, download_as="dataframe")
+    return read_processed_table(DS_BUCKET, path)
 
 
-def get_demographic_datasets() -> dict:
+def get_cohort_masks() -> pd.DataFrame:
+    """
+    Function to load the masks of the cohorts of households defined in `config/cohorts.yaml`.
+    Returns:
+        pd.DataFrame: One boolean column per cohort, indexed by the household `sernum`.
+    """
+    path = "data/processed/filtered_dataframes/cohorts.csv"
+    return read_processed_table(DS_BUCKET, path).set_index("sernum")
+
+
+def get_demographic_datasets(max_workers: Optional[int] = None) -> dict:
     """
     Function to load the variables relating to demographics from the Family Resources Survey from the UK Data Service.
+    Args:
+        max_workers (int, optional): Number of datasets downloaded at the same time. Defaults to the config value.
     Returns:
         dict: Dictionary of datasets (in the format of dataframes) from the Family Resources Survey.
     """
-    frs_datasets = config["frs_datasets"]
-    dictionary_of_datasets = {}
-    for dataset in frs_datasets:
-        try:
-            path = f"data/processed/filtered_dataframes/demographic/{dataset}_df.csv"
-            dictionary_of_datasets[dataset] = download_obj(
-                DS_BUCKET,
-                path_from=path,
-                download_as="dataframe",
-            )
-        except:
-            print(f"Dataset {dataset} not found in variables of interest.")
-            continue
-    return dictionary_of_datasets
+    return _load_filtered_datasets(
+        "data/processed/filtered_dataframes/demographic", max_workers=max_workers
+    )
+
+
+def get_household_wide_table(columns: Optional[list] = None) -> pd.DataFrame:
+    """
+    Function to load the wide table of the people joined to their benefit unit and household.
+    Args:
+        columns (list, optional): Columns to load. Defaults to all columns.
+    Returns:
+        pd.DataFrame: One row per person, sorted by household and benefit unit (see `build_household_wide_table`).
+    """
+    path = config["household_wide_table"]["path"]
+    return read_processed_table(DS_BUCKET, path, columns=columns)
+
+
+def get_household_offsets() -> pd.DataFrame:
+    """
+    Function to load the rows of each household in the wide table.
+    Returns:
+        pd.DataFrame: The `start` and `stop` rows of each household, indexed by `sernum`.
+    """
+    path = config["household_wide_table"]["offsets_path"]
+    return read_processed_table(DS_BUCKET, path).set_index("sernum")
+
+
+def get_household_rows(
+    wide: pd.DataFrame, offsets: pd.DataFrame, sernums: list
+) -> pd.DataFrame:
+    """
+    Function to select the people of households from the wide table, as slices of its rows.
+    Args:
+        wide (pd.DataFrame): The wide table (see `get_household_wide_table`).
+        offsets (pd.DataFrame): The rows of each household (see `get_household_offsets`).
+        sernums (list): Serial numbers of the households. Households not in the table are skipped.
+    Returns:
+        pd.DataFrame: The rows of the households, in the order of `sernums`.
+    """
+    rows = offsets.reindex(pd.Index(sernums, name="sernum")).dropna()
+    starts = rows.start.to_numpy(dtype="int64")
+    lengths = rows.stop.to_numpy(dtype="int64") - starts
+    # The positions of every slice: the start of its slice plus the position within it
+    positions = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + (
+        np.arange(lengths.sum())
+    )
+    return wide.iloc[positions].reset_index(drop=True)
@@ -1,40 +1,221 @@
 """
-To read in the Family Resources Survey datasets from the UK Data Service, you have the option of two functions. One reads in every dataset into a dictionary where the key is the dataset name and the value is the pd.DataFrame. The second function allows you to read in individual datasets, with an argument to say which dataset you want to read in.
+To read in the Family Resources Survey datasets from the UK Data Service, you have the option of two functions. One returns every dataset as a mapping where the key is the dataset name and the value is the pd.DataFrame. The second function allows you to read in individual datasets, with an argument to say which dataset you want to read in.
+
+Both functions accept `columns` and `filters` arguments so only the columns and rows you need are read, e.g.
+get_individual_dataset("adult", columns=["sernum", "benunit"], filters=[("sernum", "<=", 100)])
+
+The mapping returned by `get_all_datasets` is lazy: a dataset is only downloaded the first time it is accessed, and the
+loaded datasets are kept in a cache shared by every mapping, bounded by `config["frs_lazy_datasets"]["max_cached_tables"]`.
+Each mapping copies a dataset from the cache once, on its first access, and then returns that same dataframe like a
+dict, so it can be edited in place without changing the cache or the other mappings.
+The number of rows and the columns of the datasets are read from the Parquet footers, without loading the data, e.g.
+datasets = get_all_datasets(frs_datasets)
+datasets.metadata()
+adult = datasets["adult"]
 """
 
+import logging
+import threading
 import pandas as pd
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import partial
+from typing import Dict, Iterator, List, Optional
+from afs_mission_goal.utils.parquet_storage import (
+    Filters,
+    read_parquet_metadata,
+    read_processed_table,
+)
+from afs_mission_goal.utils.bulk_load import (
+    load_concurrently,
+    raise_for_errors,
+    split_missing,
+)
 from afs_mission_goal import DS_BUCKET, config
 
+logger = logging.getLogger(__name__)
+
 frs_datasets = config["frs_datasets"]
 
+# Datasets loaded by any FRSDatasets mapping, least recently used first
+_loaded_datasets = OrderedDict()
+_loaded_datasets_lock = threading.Lock()
+# One lock per dataset, so a dataset is only downloaded once when several threads request it
+_dataset_locks = {}
+
+
+def _dataset_path(dataset: str) -> str:
+    """S3 key of a processed FRS dataset."""
+    return f"data/processed/family_resources_survey_{dataset}.csv"
+
+
+def _load_dataset(
+    dataset: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    """Load a dataset through the cache shared by the FRSDatasets mappings.
+    The cached dataframe itself is returned, the mappings copy it before handing it out.
+    """
+    key = (dataset, tuple(columns) if columns is not None else None, repr(filters))
+    with _loaded_datasets_lock:
+        dataset_lock = _dataset_locks.setdefault(key, threading.Lock())
+    with dataset_lock:
+        with _loaded_datasets_lock:
+            if key in _loaded_datasets:
+                _loaded_datasets.move_to_end(key)
+                return _loaded_datasets[key]
+        df = read_processed_table(
+            DS_BUCKET, _dataset_path(dataset), columns=columns, filters=filters
+        )
+        max_cached_tables = config.get("frs_lazy_datasets", {}).get(
+            "max_cached_tables", 8
+        )
+        with _loaded_datasets_lock:
+            _loaded_datasets[key] = df
+            while len(_loaded_datasets) > max_cached_tables:
+                _loaded_datasets.popitem(last=False)
+    return df
+
+
+def clear_dataset_cache() -> None:
+    """Remove the datasets loaded by the FRSDatasets mappings from memory."""
+    with _loaded_datasets_lock:
+        _loaded_datasets.clear()
+
+
+class FRSDatasets(Mapping):
+    """
+    Mapping of the FRS datasets, each loaded on its first access and then kept by the mapping.
+    Args:
+        datasets (list): Names of the datasets.
+        columns (Dict[str, List[str]], optional): Columns to load for each dataset. Datasets not in the dictionary are loaded with all their columns.
+        filters (Filters, optional): Row filters applied to every dataset.
+    """
+
+    def __init__(
+        self,
+        datasets: list,
+        columns: Optional[Dict[str, List[str]]] = None,
+        filters: Optional[Filters] = None,
+    ):
+        self._datasets = list(datasets)
+        self._columns = columns or {}
+        self._filters = filters
+        # The datasets accessed through this mapping, copied once from the shared cache
+        self._frames = {}
+
+    def __getitem__(self, dataset: str) -> pd.DataFrame:
+        if dataset not in self._datasets:
+            raise KeyError(dataset)
+        if dataset not in self._frames:
+            df = _load_dataset(dataset, self._columns.get(dataset), self._filters)
+            # Another thread may have copied it in the meantime, keep the first copy
+            self._frames.setdefault(dataset, df.copy())
+        return self._frames[dataset]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._datasets)
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    def __repr__(self) -> str:
+        return f"FRSDatasets({self._datasets})"
+
+    def metadata(self, max_workers: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read the number of rows and the columns of the datasets from their Parquet footers, without loading the data.
+        The row filters are not applied, and the datasets without a Parquet copy have missing values.
+        Args:
+            max_workers (int, optional): Number of footers read at the same time. Defaults to the config value.
+        Returns:
+            pd.DataFrame: The `num_rows`, `num_columns` and `columns` of each dataset, indexed by dataset.
+        """
+        loaders = {
+            dataset: partial(read_parquet_metadata, DS_BUCKET, _dataset_path(dataset))
+            for dataset in self
+        }
+        footers, errors = load_concurrently(loaders, max_workers=max_workers)
+        missing, errors = split_missing(errors)
+        raise_for_errors(errors, "FRS dataset footer")
+        for dataset in missing:
+            logger.info(f"No Parquet copy of the {dataset} dataset")
+        rows = {}
+        for dataset in self:
+            if dataset not in footers:
+                rows[dataset] = {"num_rows": None, "num_columns": None, "columns": None}
+                continue
+            columns = [
+                col
+                for col in footers[dataset].schema.names
+                if not col.startswith("__index_level_")
+            ]
+            if dataset in self._columns:
+                columns = [col for col in columns if col in self._columns[dataset]]
+            rows[dataset] = {
+                "num_rows": footers[dataset].num_rows,
+                "num_columns": len(columns),
+                "columns": columns,
+            }
+        return (
+            pd.DataFrame.from_dict(rows, orient="index")
+            .astype({"num_rows": "Int64", "num_columns": "Int64"})
+            .rename_axis("dataset")
+        )
+
 
-def get_all_datasets(frs_datasets: dict) -> dict:
+def get_all_datasets(
+    frs_datasets: dict,
+    columns: Optional[Dict[str, List[str]]] = None,
+    filters: Optional[Filters] = None,
+    max_workers: Optional[int] = None,
+    lazy: bool = True,
+) -> Mapping:
     """
     Function to load all datasets from the Family Resources Survey from the UK Data Service.
     Args:
         frs_datasets (dict): Dictionary of all datasets from the Family Resources Survey
+        columns (Dict[str, List[str]], optional): Columns to load for each dataset. Datasets not in the dictionary are loaded with all their columns.
+        filters (Filters, optional): Row filters applied to every dataset, e.g. [("sernum", "in", [1, 2])].
+        max_workers (int, optional): Number of datasets downloaded at the same time when `lazy` is False. Defaults to the config value.
+        lazy (bool): Whether to load each dataset on its first access (see `FRSDatasets`) rather than all of them now. Defaults to True.
     Returns:
-        dict: Dictionary of all datasets (in the format of dataframes) from the Family Resources Survey.
+        Mapping: Mapping of all datasets (in the format of dataframes) from the Family Resources Survey.
     """
-    dictionary_of_datasets = {}
-    for dataset in frs_datasets:
-        path = f"data/processed/family_resources_survey_{dataset}.csv"
-        dictionary_of_datasets[dataset] = download_obj(
-            DS_BUCKET, path_from=path, download_as="dataframe"
+    if lazy:
+        return FRSDatasets(frs_datasets, columns=columns, filters=filters)
+    loaders = {
+        dataset: partial(
+            read_processed_table,
+            DS_BUCKET,
+            _dataset_path(dataset),
+            columns=(columns or {}).get(dataset, None),
+            filters=filters,
         )
+        for dataset in frs_datasets
+    }
+    dictionary_of_datasets, errors = load_concurrently(loaders, max_workers=max_workers)
+    raise_for_errors(errors, "FRS dataset")
     return dictionary_of_datasets
 
 
-def get_individual_dataset(dataset: str) -> pd.DataFrame:
+def get_individual_dataset(
+    dataset: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
     """
     Function to load a specific Family Resources Survey dataset from the UK Data Service.
 
     Args:
         dataset (str): Any of the following strings - "accounts", "adult", "assets", "benefits", "benefit_unit", "care", "child", "childcare", "dictionary", "endowment", "ext_child", "frs2223", "gov_pay", "household", "job", "maint", "mort_cont", "mortgage", "odd_job", "owner", "pension_provider","pension","rent_cont", "renter","tables"
+        columns (List[str], optional): Only load these columns.
+        filters (Filters, optional): Only load the rows matching these filters, e.g. [("sernum", "in", [1, 2])].
 
     Returns:
         pd.DataFrame: A dataframe of the specified dataset.
     """
-    path = f"data/processed/family_resources_survey_{dataset}.csv"
-    return download_obj(DS_BUCKET, path_from=path, download_as="dataframe")
+    return read_processed_table(
+        DS_BUCKET, _dataset_path(dataset), columns=columns, filters=filters
+    )
@@ -1,22 +1,31 @@
 import pandas as pd
-from nesta_ds_utils.loading_saving.S3 import download_obj
+from typing import List, Optional
+from afs_mission_goal.utils.parquet_storage import Filters, read_processed_table
 from afs_mission_goal import DS_BUCKET
 
 
-def get_wealth_and_assets_survey(wave: int, granularity: str, **kwargs) -> pd.DataFrame:
+def get_wealth_and_assets_survey(
+    wave: int,
+    granularity: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+    **kwargs,
+) -> pd.DataFrame:
     """Function to load the Wealth and Assets Survey data from the UK Data Service.
     Args:
         wave (int): The wave of the Wealth and Assets Survey. Must be between 1 and 7.
         granularity (str): The granularity of the data, must be either "person" or "household".
+        columns (List[str], optional): Only load these columns.
+        filters (Filters, optional): Only load the rows matching these filters.
         kwargs:
             wave_5_household_month (str): The month of the wave 5 household data to load. Must be either "feb" or "sept".
     Returns:
         pd.DataFrame: Wealth and Assets Survey data.
     """
-    kwargs.get("wave_5_household_month", None)
+    wave_5_household_month = kwargs.get("wave_5_household_month", None)
 
     if wave == 5 and granularity == "household" and wave_5_household_month is not None:
         path = f"data/processed/wealth_and_assets_survey_{granularity}_wave_{wave}_{wave_5_household_month}.csv"
     else:
         path = f"data/processed/wealth_and_assets_survey_{granularity}_wave_{wave}.csv"
-    return download_obj(DS_BUCKET, path_from=path, download_as="dataframe")
+    return read_processed_table(DS_BUCKET, path, columns=columns, filters=filters)
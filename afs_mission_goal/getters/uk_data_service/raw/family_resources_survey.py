@@ -1,14 +1,33 @@
 import pandas as pd
+from typing import Iterator, List, Optional, Union
 from afs_mission_goal.utils.load_s3 import load_from_s3
 from afs_mission_goal import DS_BUCKET
 
 
-def get_raw_frs_data(dataset: str) -> pd.DataFrame:
+def get_raw_frs_data(
+    dataset: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[list] = None,
+    chunksize: Optional[int] = None,
+    downcast: bool = False,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
     """Function to load the Family Resources Survey data from the UK Data Service.
     Args:
         dataset (str): The dataset to load. They're stored in a frs_datasets config.
+        columns (List[str], optional): Only load these columns (matched ignoring case), e.g. ["SERNUM", "BENUNIT"].
+        filters (list, optional): Only load the rows matching these filters, e.g. [("SERNUM", "<=", 100)].
+            Column names must be written as in the raw file.
+        chunksize (int, optional): If given, return an iterator of dataframes with at most this many rows.
+        downcast (bool): Whether to downcast float64 columns to float32. Default is False.
     Returns:
-        pd.DataFrame: Family Resources Survey data.
+        Union[pd.DataFrame, Iterator[pd.DataFrame]]: Family Resources Survey data, or an iterator of chunks of it if `chunksize` is given.
     """
     path = f"raw/family_resources_survey/2022/{dataset}.dta"
-    return load_from_s3(path, bucket=DS_BUCKET)
+    return load_from_s3(
+        path,
+        bucket=DS_BUCKET,
+        columns=columns,
+        filters=filters,
+        chunksize=chunksize,
+        downcast=downcast,
+    )
@@ -1,4 +1,5 @@
 import pandas as pd
+from typing import Iterator, List, Optional, Union
 from afs_mission_goal.utils.load_s3 import load_from_s3
 from afs_mission_goal.getters.uk_data_service.misc.get_wealth_and_assets_survey_dict import (
     get_wealth_and_assets_survey_dict,
@@ -8,16 +9,14 @@ from afs_mission_goal import DS_BUCKET
 dictionary = get_wealth_and_assets_survey_dict()
 
 
-def get_wealth_and_assets_survey(
-    wave=1, granularity="person", **kwargs
-) -> pd.DataFrame:
-    """Function to load the Wealth and Assets Survey data from the UK Data Service.
+def get_wealth_and_assets_survey_path(wave=1, granularity="person", **kwargs) -> str:
+    """Function to get the path of a raw Wealth and Assets Survey file after 'data/' in the UK Data Service bucket.
     Args:
         wave (int): Wave of the survey. Default is 1. Can be any number from 1 to 7.
         granularity (str): Granularity of the data. Default is "person". Can be "person" or "household".
         wave_5_household_month (str): Month of the wave 5 household data. Default is None. Can be "feb" or "sept".
     Returns:
-        pd.DataFrame: Wealth and Assets Survey data.
+        str: Path of the raw Stata file.
     """
     wave_5_household_month = kwargs.get("wave_5_household_month", None)
     if wave == 5 and granularity == "household" and wave_5_household_month is not None:
@@ -26,5 +25,36 @@ def get_wealth_and_assets_survey(
     else:
         fname = dictionary[f"wave_{wave}_{granularity}"]
         filename = f"{fname}.dta"
-    path = "raw/wealth_and_assets_survey/" + filename
-    return load_from_s3(path, bucket=DS_BUCKET)
+    return "raw/wealth_and_assets_survey/" + filename
+
+
+def get_wealth_and_assets_survey(
+    wave=1,
+    granularity="person",
+    columns: Optional[List[str]] = None,
+    filters: Optional[list] = None,
+    chunksize: Optional[int] = None,
+    downcast: bool = False,
+    **kwargs,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Function to load the Wealth and Assets Survey data from the UK Data Service.
+    Args:
+        wave (int): Wave of the survey. Default is 1. Can be any number from 1 to 7.
+        granularity (str): Granularity of the data. Default is "person". Can be "person" or "household".
+        columns (List[str], optional): Only load these columns (matched ignoring case).
+        filters (list, optional): Only load the rows matching these filters. Column names must be written as in the raw file.
+        chunksize (int, optional): If given, return an iterator of dataframes with at most this many rows.
+        downcast (bool): Whether to downcast float64 columns to float32. Default is False.
+        wave_5_household_month (str): Month of the wave 5 household data. Default is None. Can be "feb" or "sept".
+    Returns:
+        Union[pd.DataFrame, Iterator[pd.DataFrame]]: Wealth and Assets Survey data, or an iterator of chunks of it if `chunksize` is given.
+    """
+    path = get_wealth_and_assets_survey_path(wave, granularity, **kwargs)
+    return load_from_s3(
+        path,
+        bucket=DS_BUCKET,
+        columns=columns,
+        filters=filters,
+        chunksize=chunksize,
+        downcast=downcast,
+    )
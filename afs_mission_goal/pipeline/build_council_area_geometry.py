@@ -0,0 +1,104 @@
+"""
+Builds the simplified geometry of the Scottish council areas used to map the CHPS tables.
+
+The council area boundaries are parsed from their GeoJSON once, restricted to the
+council areas of the CHPS lookup, simplified and saved as GeoParquet, keyed by
+`local_authority_code` like the CHPS tables. The maps then read the small GeoParquet
+(see `afs_mission_goal/getters/chps/processed/get_chps_geometry.py`) instead of parsing
+the GeoJSON every time.
+
+The source GeoJSON, its code column and the simplification are set in
+`config["council_area_geometry"]`.
+
+Usage:
+python -m afs_mission_goal.pipeline.build_council_area_geometry
+"""
+
+import logging
+from typing import Optional
+
+import geopandas as gpd
+import pandas as pd
+
+from afs_mission_goal import S3_BUCKET, config
+from afs_mission_goal.getters.chps.processed.get_clean_chps_lookup import (
+    get_clean_chps_lookup,
+)
+from afs_mission_goal.utils.load_s3 import load_from_s3
+from afs_mission_goal.utils.parquet_storage import upload_parquet
+from afs_mission_goal.utils.preprocessing import convert_geojson_to_gpd
+
+logger = logging.getLogger(__name__)
+
+# Codes of the Scottish council areas, e.g. "S12000033"
+COUNCIL_AREA_CODE_PATTERN = r"^S12\d{6}$"
+
+
+def council_area_codes(lookup: pd.DataFrame) -> pd.Series:
+    """The council area codes of the CHPS lookup, from the column holding them.
+
+    Args:
+        lookup (pd.DataFrame): The clean CHPS lookup (see `get_clean_chps_lookup`).
+
+    Raises:
+        ValueError: If no column of the lookup holds council area codes.
+
+    Returns:
+        pd.Series: The distinct council area codes.
+    """
+    for col in lookup.columns:
+        values = lookup[col].dropna().astype(str).str.strip()
+        if len(values) and values.str.match(COUNCIL_AREA_CODE_PATTERN).all():
+            return values.drop_duplicates().reset_index(drop=True)
+    raise ValueError("No column of the CHPS lookup holds council area codes.")
+
+
+def build_council_area_geometry(
+    geojson: dict,
+    codes: pd.Series,
+    code_column: str,
+    simplify_crs: str = "EPSG:27700",
+    simplify_tolerance: Optional[float] = 100,
+) -> gpd.GeoDataFrame:
+    """Parse, restrict and simplify the council area boundaries.
+
+    Args:
+        geojson (dict): The GeoJSON of the council area boundaries, in WGS84.
+        codes (pd.Series): The council area codes to keep.
+        code_column (str): The property of the features holding their council area code.
+        simplify_crs (str): The projected CRS in which the boundaries are simplified. Defaults to British National Grid.
+        simplify_tolerance (float, optional): The simplification tolerance, in the units of `simplify_crs`.
+            If None, the boundaries are not simplified. Defaults to 100.
+
+    Returns:
+        gpd.GeoDataFrame: One row per council area, with its `local_authority_code` and boundary in WGS84.
+    """
+    gdf = convert_geojson_to_gpd(geojson).set_crs("EPSG:4326", allow_override=True)
+    gdf = gdf.rename(columns={code_column: "local_authority_code"})
+    gdf = gdf[gdf.local_authority_code.isin(codes)][
+        ["local_authority_code", "geometry"]
+    ]
+    missing = set(codes) - set(gdf.local_authority_code)
+    if missing:
+        logger.warning(f"No boundary for the council areas {sorted(missing)}")
+    if simplify_tolerance:
+        gdf = gdf.to_crs(simplify_crs)
+        gdf["geometry"] = gdf.geometry.simplify(
+            simplify_tolerance, preserve_topology=True
+        )
+    return gdf.to_crs("EPSG:4326").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    geometry_config = config["council_area_geometry"]
+    gdf = build_council_area_geometry(
+        load_from_s3(geometry_config["source"]),
+        council_area_codes(get_clean_chps_lookup()),
+        geometry_config["code_column"],
+        geometry_config["simplify_crs"],
+        geometry_config["simplify_tolerance"],
+    )
+    upload_parquet(gdf, S3_BUCKET, geometry_config["path"])
+    logger.info(
+        f"Saved the boundaries of {len(gdf)} council areas to {geometry_config['path']}"
+    )
@@ -0,0 +1,114 @@
+"""
+Builds the index of the Family Resources Survey variables.
+
+The metadata of the FRS variables is spread over the raw `dictnary` table (the label of
+each variable), `data/aux/frs.json` (the readable names of the columns) and the
+`data/aux/frs_variables/*_variables.json` files (the labels of the values of each
+dataset). They are combined once into one small Parquet table, versioned by
+`FRS_DICTIONARY_INDEX_VERSION`, which the pipeline scripts load lazily as dictionaries
+(see `afs_mission_goal/getters/uk_data_service/misc/get_frs_dictionary_index.py`)
+instead of downloading and parsing every source on each run.
+
+The index has one row per variable and dataset, with the columns:
+    - variable: the variable name in upper case
+    - table: the table of the variable in the dictionary, if it has one
+    - label: the label of the variable in the dictionary
+    - clean_label: the label cleaned with `preprocess_strings`, the name of the column in the filtered dataframes
+    - name: the column name in `frs.json`, as written there
+    - readable_name: the readable name of the column in `frs.json`
+    - dataset: the dataset of the value labels
+    - value_labels: the labels of the values of the variable in the dataset, as JSON
+
+Usage:
+python -m afs_mission_goal.pipeline.build_frs_dictionary_index
+"""
+
+import json
+import logging
+from typing import Dict
+
+import pandas as pd
+
+from afs_mission_goal import DS_BUCKET
+from afs_mission_goal.getters.uk_data_service.misc.get_family_resources_survey_dict import (
+    get_family_resources_survey_dict,
+)
+from afs_mission_goal.getters.uk_data_service.misc.get_frs_dictionary_index import (
+    frs_dictionary_index_path,
+)
+from afs_mission_goal.getters.uk_data_service.misc.get_frs_variables import (
+    get_frs_variables_dict,
+)
+from afs_mission_goal.getters.uk_data_service.raw.family_resources_survey import (
+    get_raw_frs_data,
+)
+from afs_mission_goal.utils.parquet_storage import upload_parquet
+from afs_mission_goal.utils.preprocessing import preprocess_strings
+
+logger = logging.getLogger(__name__)
+
+
+def build_frs_dictionary_index(
+    dictionary: pd.DataFrame,
+    readable_names: Dict[str, str],
+    value_labels: Dict[str, Dict[str, dict]],
+) -> pd.DataFrame:
+    """
+    Combine the metadata of the FRS variables into one index.
+
+    Args:
+        dictionary (pd.DataFrame): The raw FRS `dictnary` table, with VARIABLE and LABEL columns, and optionally TABLE.
+        readable_names (Dict[str, str]): The readable names of the columns (see `get_family_resources_survey_dict`).
+        value_labels (Dict[str, Dict[str, dict]]): The labels of the values of the variables of each dataset
+            (see `get_frs_variables_dict`).
+
+    Returns:
+        pd.DataFrame: The index, described in the module docstring.
+    """
+    dictionary = dictionary.rename(columns=str.upper)
+    labels = pd.DataFrame(
+        {
+            "variable": dictionary["VARIABLE"].str.upper(),
+            "table": dictionary["TABLE"] if "TABLE" in dictionary else None,
+            "label": dictionary["LABEL"],
+        }
+    )
+    # A variable listed several times takes its last label, as when the labels were mapped directly
+    labels = labels.drop_duplicates(subset="variable", keep="last")
+    labels["clean_label"] = preprocess_strings(labels["label"])
+    names = pd.DataFrame(
+        {
+            "variable": [name.upper() for name in readable_names],
+            "name": list(readable_names),
+            "readable_name": list(readable_names.values()),
+        }
+    )
+    values = pd.DataFrame(
+        [
+            {
+                "variable": variable.upper(),
+                "dataset": dataset,
+                "value_labels": json.dumps(labels_of_values),
+            }
+            for dataset, variables in value_labels.items()
+            for variable, labels_of_values in variables.items()
+        ],
+        columns=["variable", "dataset", "value_labels"],
+    )
+    return (
+        labels.merge(names, on="variable", how="outer")
+        .merge(values, on="variable", how="outer")
+        .reset_index(drop=True)
+    )
+
+
+if __name__ == "__main__":
+    index = build_frs_dictionary_index(
+        get_raw_frs_data("dictnary"),
+        get_family_resources_survey_dict(),
+        get_frs_variables_dict(),
+    )
+    upload_parquet(index, DS_BUCKET, frs_dictionary_index_path())
+    logger.info(
+        f"Saved the index of {index.variable.nunique()} FRS variables to {frs_dictionary_index_path()}"
+    )
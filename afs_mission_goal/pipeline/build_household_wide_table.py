@@ -0,0 +1,139 @@
+"""
+Builds the wide table of the FRS people, joined to their benefit unit and household.
+
+The filtered adult and child dataframes are stacked (one row per person, with a
+`person_type` column), sorted by household and benefit unit, and the columns of the
+benefit unit and household dataframes are aligned to each person by position rather
+than merged. A column name used by several dataframes is prefixed by its dataframe
+(e.g. "household_age"), the keys are shared.
+
+The table is saved with the offsets of the rows of each household, so the people of
+a household are a slice of the table (see `get_household_rows`) instead of a merge of
+the four dataframes.
+
+Usage:
+python -m afs_mission_goal.pipeline.build_household_wide_table
+"""
+
+import logging
+from functools import partial
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from afs_mission_goal import DS_BUCKET, config
+from afs_mission_goal.utils.bulk_load import load_concurrently, raise_for_errors
+from afs_mission_goal.utils.household_aggregation import (
+    align_to_households,
+    household_index,
+)
+from afs_mission_goal.utils.parquet_storage import read_processed_table, upload_parquet
+
+logger = logging.getLogger(__name__)
+
+WIDE_TABLE_DATASETS = ["adult", "child", "benefit_unit", "household"]
+
+
+def _prefix_shared_columns(
+    datasets: Dict[str, pd.DataFrame], keys: list
+) -> Dict[str, pd.DataFrame]:
+    """Prefix the columns found in several dataframes by the name of their dataframe, except the keys."""
+    counts = pd.Series(
+        [col for df in datasets.values() for col in set(df.columns) - set(keys)]
+    ).value_counts()
+    shared = set(counts[counts > 1].index)
+    return {
+        name: df.rename(columns={col: f"{name}_{col}" for col in shared})
+        for name, df in datasets.items()
+    }
+
+
+def build_household_wide_table(
+    datasets: Dict[str, pd.DataFrame], benunit_column: str = "benunit"
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Join the people of the FRS to their benefit unit and household.
+
+    Args:
+        datasets (Dict[str, pd.DataFrame]): The filtered adult, child, benefit_unit and household dataframes.
+        benunit_column (str): The column of the benefit unit number. Defaults to "benunit".
+
+    Raises:
+        ValueError: If a dataframe misses a key, or a benefit unit or household has several rows.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The wide table, one row per person sorted by household
+            and benefit unit, and the `start` and `stop` rows of each household (`sernum`).
+    """
+    person_keys = ["sernum", benunit_column]
+    for name, keys in [
+        ("adult", person_keys),
+        ("child", person_keys),
+        ("benefit_unit", person_keys),
+        ("household", ["sernum"]),
+    ]:
+        missing = set(keys) - set(datasets[name].columns)
+        if missing:
+            raise ValueError(f"The {name} dataframe has no {sorted(missing)} column.")
+    datasets = _prefix_shared_columns(datasets, person_keys)
+
+    people = pd.concat(
+        [
+            datasets["adult"].assign(person_type="adult"),
+            datasets["child"].assign(person_type="child"),
+        ],
+        ignore_index=True,
+    )
+    people = people.sort_values(
+        person_keys + ["person_type"], kind="stable"
+    ).reset_index(drop=True)
+
+    # Align the benefit unit and household of every person, instead of merging them
+    benefit_unit = datasets["benefit_unit"].drop_duplicates()
+    if benefit_unit.duplicated(subset=person_keys).any():
+        raise ValueError("Some benefit units have several rows.")
+    benefit_unit_columns = (
+        benefit_unit.set_index(person_keys)
+        .reindex(pd.MultiIndex.from_frame(people[person_keys]))
+        .reset_index(drop=True)
+    )
+    household_columns = align_to_households(
+        pd.Index(people.sernum, name="sernum"),
+        datasets["household"].drop_duplicates(),
+        fill_value=np.nan,
+    ).reset_index(drop=True)
+    wide = pd.concat([people, benefit_unit_columns, household_columns], axis=1)
+
+    # The rows of each household, as the table is sorted by household
+    sernums = wide.sernum.to_numpy()
+    households = household_index(wide.sernum)
+    offsets = pd.DataFrame(
+        {
+            "sernum": households,
+            "start": np.searchsorted(sernums, households, side="left"),
+            "stop": np.searchsorted(sernums, households, side="right"),
+        }
+    )
+    return wide, offsets
+
+
+if __name__ == "__main__":
+    wide_config = config["household_wide_table"]
+    datasets, errors = load_concurrently(
+        {
+            dataset: partial(
+                read_processed_table,
+                DS_BUCKET,
+                f"data/processed/filtered_dataframes/{dataset}_df.csv",
+            )
+            for dataset in WIDE_TABLE_DATASETS
+        }
+    )
+    raise_for_errors(errors, "filtered FRS dataset")
+    wide, offsets = build_household_wide_table(datasets, wide_config["benunit_column"])
+    upload_parquet(wide, DS_BUCKET, wide_config["path"])
+    upload_parquet(offsets, DS_BUCKET, wide_config["offsets_path"])
+    logger.info(
+        f"Saved the wide table of {len(wide)} people in {len(offsets)} households"
+    )
@@ -0,0 +1,176 @@
+"""
+Cleans the CHPS tables described in `config/chps_tables.yaml` and uploads them to S3.
+
+Every table and year is fetched, cleaned and uploaded concurrently, so a full CHPS refresh
+is one parallel job. A new table only needs an entry in the registry, and a new year only
+needs adding to its `years`.
+
+Each year of a table is saved, with typed counts and suppression masks, to the
+year-partitioned dataset (see `afs_mission_goal/utils/chps_registry.py`); the latest
+year is also saved as the processed table read by the getters when no year is given.
+Its CSV copy keeps the earlier layout, with the suppressed counts as "<5" and no masks.
+
+Usage:
+python -m afs_mission_goal.pipeline.clean_chps_tables
+python -m afs_mission_goal.pipeline.clean_chps_tables --tables t1_la_simd lookup --years 2023 2024
+"""
+
+import argparse
+import logging
+from functools import partial
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from afs_mission_goal import S3_BUCKET, chps_tables_config
+from afs_mission_goal.pipeline.cleaning_functions_chps import (
+    clean_chps,
+    infer_column_types,
+    load_chps_table,
+)
+from afs_mission_goal.utils.bulk_load import load_concurrently, raise_for_errors
+from afs_mission_goal.utils.chps_registry import (
+    Years,
+    chps_table,
+    chps_years,
+    output_key,
+    output_table,
+    partition_key,
+    raw_key,
+    resolve_chps_years,
+)
+from afs_mission_goal.utils.parquet_storage import save_processed_table, upload_parquet
+from afs_mission_goal.utils.preprocessing import remove_nan_rows_and_columns
+from afs_mission_goal.utils.suppression import render_suppressed, split_suppressed
+from afs_mission_goal.utils.s3_cache import cached_download_obj
+
+logger = logging.getLogger(__name__)
+
+CHPS_MODES = ["simd", "individual", "lookup"]
+
+
+def clean_chps_table(name: str, year: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load and clean one year of a CHPS table as described by its registry entry.
+
+    Args:
+        name (str): Name of the table in the registry (see `config/chps_tables.yaml`).
+        year (int, optional): The publication year. Defaults to the latest year.
+
+    Returns:
+        pd.DataFrame: The cleaned table.
+    """
+    table = chps_table(name)
+    mode = table["mode"]
+    if mode not in CHPS_MODES:
+        raise ValueError(f'CHPS mode "{mode}" is not one of {CHPS_MODES}.')
+    if mode == "lookup":
+        df = cached_download_obj(
+            S3_BUCKET, raw_key(name, year), download_as="dataframe"
+        )
+        # No preprocessing of the columns required for the lookup
+        return remove_nan_rows_and_columns(df)[: table["keep_rows"]]
+    df = load_chps_table(raw_key(name, year))
+    df_clean = clean_chps(df, simd=mode == "simd", header_detected=True)
+    if table.get("rename"):
+        df_clean = df_clean.rename(columns=table["rename"])
+    if table.get("drop_last_columns"):
+        df_clean = df_clean.iloc[:, : -table["drop_last_columns"]]
+    return df_clean
+
+
+def clean_and_save_chps_table(name: str, year: int) -> int:
+    """
+    Clean one year of a CHPS table and save it typed to its partition, and to its
+    processed table if it is the latest year. The counts are parsed once here (see
+    `split_suppressed`), so the getters read them without any conversion.
+
+    Args:
+        name (str): Name of the table in the registry.
+        year (int): The publication year.
+
+    Returns:
+        int: The number of rows saved.
+    """
+    df_typed = infer_column_types(split_suppressed(clean_chps_table(name, year)))
+    upload_parquet(
+        df_typed.assign(publication_year=year),
+        S3_BUCKET,
+        partition_key(output_table(name), year),
+    )
+    if year == chps_years()[-1]:
+        # The CSV copy keeps the layout of the CSV readers, with the suppressed counts as "<5"
+        save_processed_table(
+            df_typed,
+            S3_BUCKET,
+            output_key(name),
+            csv_copy=render_suppressed(df_typed, text="<5"),
+        )
+    return len(df_typed)
+
+
+def run_chps_pipeline(
+    table_names: Optional[List[str]] = None,
+    years: Years = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Clean and upload CHPS tables concurrently, for one or more years.
+
+    Args:
+        table_names (List[str], optional): Names of the registry entries to clean. Defaults to every table.
+        years (Union[int, Iterable[int]], optional): The publication years to clean. Defaults to every year in the registry.
+        max_workers (int, optional): Number of tables processed at the same time.
+            Defaults to `config["bulk_loading"]["max_workers"]`.
+
+    Raises:
+        RuntimeError: If any table failed; the other tables are still uploaded.
+
+    Returns:
+        Dict[str, int]: The number of rows saved for each table and year, keyed by "<table>/<year>".
+    """
+    tables = chps_tables_config["tables"]
+    table_names = table_names or list(tables)
+    unknown = set(table_names) - set(tables)
+    if unknown:
+        raise ValueError(f"Unknown CHPS tables: {sorted(unknown)}")
+    years = chps_years() if years is None else resolve_chps_years(years)
+    rows, errors = load_concurrently(
+        {
+            f"{name}/{year}": partial(clean_and_save_chps_table, name, year)
+            for name in table_names
+            for year in years
+        },
+        max_workers=max_workers,
+    )
+    for job, n_rows in rows.items():
+        logger.info(f"Saved {n_rows} rows of {job}")
+    raise_for_errors(errors, "CHPS table")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the CHPS tables.")
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        default=None,
+        help="Only clean these tables (names from config/chps_tables.yaml).",
+    )
+    parser.add_argument(
+        "--years",
+        nargs="+",
+        type=int,
+        default=None,
+        help="Only clean these publication years.",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="Number of tables processed at the same time.",
+    )
+    args = parser.parse_args()
+    run_chps_pipeline(
+        table_names=args.tables, years=args.years, max_workers=args.max_workers
+    )
@@ -1,11 +1,29 @@
 from afs_mission_goal.getters.uk_data_service.raw.wealth_and_assets_survey import (
     get_wealth_and_assets_survey,
+    get_wealth_and_assets_survey_path,
 )
-from afs_mission_goal.utils.preprocessing import preprocess_strings
+from afs_mission_goal.utils.preprocessing import preprocess_string, preprocess_strings
 import pandas as pd
 import numpy as np
-from nesta_ds_utils.loading_saving import S3
-from afs_mission_goal import DS_BUCKET
+from afs_mission_goal.utils.parquet_storage import save_processed_table_chunks
+from afs_mission_goal.utils.completion_markers import (
+    is_complete,
+    is_forced,
+    object_fingerprint,
+    write_marker,
+)
+from afs_mission_goal import DS_BUCKET, config
+import argparse
+import hashlib
+import inspect
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
 
 
 def clean_wealth_and_assets_survey(wealth_and_assets_survey_data: pd.DataFrame):
@@ -23,51 +41,216 @@ def clean_wealth_and_assets_survey(wealth_and_assets_survey_data: pd.DataFrame):
     return wealth_and_assets_survey_data
 
 
-if __name__ == "__main__":
-    # Loading raw data at person level
-    for i in range(1, 8):
-        wealth_and_assets_person = get_wealth_and_assets_survey(
-            wave=i, granularity="person"
-        )
-        wealth_and_assets_person = clean_wealth_and_assets_survey(
-            wealth_and_assets_person
-        )
+def clean_and_save_wealth_and_assets_survey(
+    wave: int, granularity: str, path_to: str, **kwargs
+) -> int:
+    """
+    Cleans one Wealth and Assets Survey file chunk by chunk and saves it to S3, so only one chunk is held in memory.
 
-        # Saving cleaned data
-        S3.upload_obj(
-            obj=wealth_and_assets_person,
-            bucket=DS_BUCKET,
-            path_to=f"data/processed/wealth_and_assets_survey_person_wave_{i}.csv",
-            kwargs_writing={"index": False},
-        )
+    Args:
+        wave (int): Wave of the survey, from 1 to 7.
+        granularity (str): Granularity of the data, "person" or "household".
+        path_to (str): S3 path to save the cleaned data to.
+        kwargs:
+            wave_5_household_month (str): Month of the wave 5 household data, "feb" or "sept".
+
+    Returns:
+        int: The number of rows saved.
+    """
+    chunks = get_wealth_and_assets_survey(
+        wave=wave,
+        granularity=granularity,
+        chunksize=config["stata_chunks"]["chunksize"],
+        downcast=config["stata_chunks"]["downcast"],
+        **kwargs,
+    )
+    return save_processed_table_chunks(
+        (clean_wealth_and_assets_survey(chunk) for chunk in chunks),
+        bucket=DS_BUCKET,
+        path_to=path_to,
+    )
+
+
+def wealth_and_assets_survey_jobs() -> List[dict]:
+    """
+    Lists the Wealth and Assets Survey files to clean: 7 person waves and 8 household files (wave 5 has February and September files).
 
+    Returns:
+        List[dict]: One dictionary per file with the "name" of the job and the keyword arguments
+            of `clean_and_save_wealth_and_assets_survey`.
+    """
+    jobs = []
+    for i in range(1, 8):
+        jobs.append(
+            {
+                "wave": i,
+                "granularity": "person",
+                "path_to": f"data/processed/wealth_and_assets_survey_person_wave_{i}.csv",
+            }
+        )
     for i in range(1, 8):
         if i != 5:
-            wealth_and_assets_household = get_wealth_and_assets_survey(
-                wave=i, granularity="household"
-            )
-            wealth_and_assets_household = clean_wealth_and_assets_survey(
-                wealth_and_assets_household
-            )
-            # Saving cleaned data
-            S3.upload_obj(
-                obj=wealth_and_assets_household,
-                bucket=DS_BUCKET,
-                path_to=f"data/processed/wealth_and_assets_survey_household_wave_{i}.csv",
-                kwargs_writing={"index": False},
+            jobs.append(
+                {
+                    "wave": i,
+                    "granularity": "household",
+                    "path_to": f"data/processed/wealth_and_assets_survey_household_wave_{i}.csv",
+                }
             )
         else:
             for month in ["feb", "sept"]:
-                wealth_and_assets_household = get_wealth_and_assets_survey(
-                    wave=i, granularity="household", wave_5_household_month=month
-                )
-                wealth_and_assets_household = clean_wealth_and_assets_survey(
-                    wealth_and_assets_household
-                )
-                # Saving cleaned data
-                S3.upload_obj(
-                    obj=wealth_and_assets_household,
-                    bucket=DS_BUCKET,
-                    path_to=f"data/processed/wealth_and_assets_survey_household_wave_{i}_{month}.csv",
-                    kwargs_writing={"index": False},
+                jobs.append(
+                    {
+                        "wave": i,
+                        "granularity": "household",
+                        "path_to": f"data/processed/wealth_and_assets_survey_household_wave_{i}_{month}.csv",
+                        "wave_5_household_month": month,
+                    }
                 )
+    for job in jobs:
+        job["name"] = Path(job["path_to"]).stem
+    return jobs
+
+
+def available_memory_bytes() -> Optional[int]:
+    """
+    Returns the memory currently available on the machine, or None if it cannot be determined.
+
+    On Linux this is `MemAvailable` from /proc/meminfo, which counts the page cache that can be
+    reclaimed; elsewhere only the free memory reported by `os.sysconf` is known.
+    """
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def cleaning_code_fingerprint() -> str:
+    """
+    Fingerprint of the code and settings that clean a file, stored in its completion marker
+    with the ETag of the raw file, so a change to the cleaning cleans every file again.
+    """
+    digest = hashlib.sha256()
+    for function in [
+        clean_wealth_and_assets_survey,
+        clean_and_save_wealth_and_assets_survey,
+        preprocess_strings,
+        preprocess_string,
+        save_processed_table_chunks,
+    ]:
+        digest.update(inspect.getsource(function).encode("utf-8"))
+    digest.update(str(config["stata_chunks"]["downcast"]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def memory_aware_workers(max_workers: Optional[int] = None) -> int:
+    """
+    Number of worker processes to run, capped by the number of CPUs and by the available memory
+    divided by `config["was_pipeline"]["memory_per_worker_gb"]`.
+
+    Args:
+        max_workers (int, optional): Upper limit on the number of workers. Defaults to the config value.
+
+    Returns:
+        int: The number of workers, at least 1.
+    """
+    pipeline_config = config["was_pipeline"]
+    workers = min(max_workers or pipeline_config["max_workers"], os.cpu_count() or 1)
+    memory = available_memory_bytes()
+    if memory is not None:
+        per_worker = pipeline_config["memory_per_worker_gb"] * 1024**3
+        workers = min(workers, int(memory // per_worker))
+    return max(workers, 1)
+
+
+def _run_job(job: dict) -> int:
+    """
+    Runs one cleaning job in a worker process.
+    """
+    kwargs = {key: value for key, value in job.items() if key != "name"}
+    return clean_and_save_wealth_and_assets_survey(**kwargs)
+
+
+def run_wealth_and_assets_survey_pipeline(
+    max_workers: Optional[int] = None, force: bool = False
+) -> None:
+    """
+    Cleans every Wealth and Assets Survey file, running the files concurrently in a process pool.
+
+    A completion marker is written for every file once it is saved, together with the ETag of the
+    raw file it was cleaned from and the fingerprint of the cleaning code (see `cleaning_code_fingerprint`).
+    Files whose marker matches the current raw file and code are skipped, so a rerun after a failure
+    only processes the files that did not finish.
+
+    Args:
+        max_workers (int, optional): Upper limit on the number of worker processes. Defaults to the config value.
+        force (bool): Whether to clean every file, even those that already completed. Defaults to False.
+
+    Raises:
+        RuntimeError: If any of the files failed; the others are still saved and marked as complete.
+    """
+    pending = {}
+    code_fingerprint = cleaning_code_fingerprint()
+    for job in wealth_and_assets_survey_jobs():
+        kwargs = {k: v for k, v in job.items() if k == "wave_5_household_month"}
+        raw_path = get_wealth_and_assets_survey_path(
+            job["wave"], job["granularity"], **kwargs
+        )
+        raw_fingerprint = object_fingerprint(DS_BUCKET, ["data/" + raw_path])
+        fingerprint = hashlib.sha256(
+            f"{raw_fingerprint}:{code_fingerprint}".encode("utf-8")
+        ).hexdigest()
+        if not force and is_complete(DS_BUCKET, job["name"], fingerprint):
+            logger.info(f"Skipping {job['name']}, already complete")
+            continue
+        pending[job["name"]] = (job, fingerprint)
+
+    workers = memory_aware_workers(max_workers)
+    logger.info(f"Cleaning {len(pending)} files with {workers} worker(s)")
+    failures = {}
+    # Spawn rather than fork the workers, as the boto3 clients are not fork safe
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(_run_job, job): name for name, (job, _) in pending.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                n_rows = future.result()
+            except Exception as e:
+                logger.error(f"Failed to clean {name}: {e!r}")
+                failures[name] = e
+                continue
+            write_marker(DS_BUCKET, name, pending[name][1], rows=n_rows)
+
+    if failures:
+        raise RuntimeError(
+            f"Failed to clean {len(failures)} file(s): {', '.join(failures)}. Rerun to resume."
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Clean the Wealth and Assets Survey files."
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=None, help="Maximum number of processes."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Clean every file, including those that already completed.",
+    )
+    args = parser.parse_args()
+    run_wealth_and_assets_survey_pipeline(
+        max_workers=args.max_workers, force=args.force or is_forced()
+    )
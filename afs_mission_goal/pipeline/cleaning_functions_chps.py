@@ -1,9 +1,51 @@
 import pandas as pd
+from pathlib import Path
+from typing import Optional, Union
+from afs_mission_goal.utils.s3_cache import fetch_object, get_cache_settings
 from afs_mission_goal.utils.preprocessing import (
     remove_nan_rows_and_columns,
     preprocess_strings,
 )
-from afs_mission_goal import health_review_config
+from afs_mission_goal.utils.suppression import fill_suppressed, render_suppressed
+from afs_mission_goal import health_review_config, S3_BUCKET
+
+
+def find_header_row(
+    df: pd.DataFrame, marker: str = "row_id", block_size: int = 256
+) -> Optional[int]:
+    """
+    Find the position of the first row of a DataFrame with a cell equal to `marker`.
+
+    The rows are compared to the marker a block at a time with a NumPy equality mask,
+    stopping at the first block with a match, so only the rows above the header are scanned.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to search.
+        marker (str): The value marking the header row. Defaults to "row_id".
+        block_size (int): Number of rows compared at a time. Defaults to 256.
+
+    Returns:
+        Optional[int]: The position of the header row, or None if no cell matches the marker.
+    """
+    for start in range(0, len(df), block_size):
+        block = df.iloc[start : start + block_size].to_numpy(dtype=object)
+        rows_with_marker = (block == marker).any(axis=1)
+        if rows_with_marker.any():
+            return start + int(rows_with_marker.argmax())
+    return None
+
+
+def _set_header_row(df: pd.DataFrame, row_number: int) -> pd.DataFrame:
+    """Use a row as the column names, dropping the rows above it and the all-NaN rows and columns."""
+    # Pull out the row with the new column names
+    header = df.iloc[row_number]
+    # Remove the rows above the new column names
+    df = df.iloc[row_number + 1 :]
+    # Rename the columns to the new header
+    df.columns = list(header)
+    # Remove the columns and rows that are all NaN
+    df = remove_nan_rows_and_columns(df)
+    return df.reset_index(drop=True)
 
 
 def remove_extra_rows_and_columns_chps(df):
@@ -28,27 +70,66 @@ def remove_extra_rows_and_columns_chps(df):
 
     Notes:
     ------
-    - The function searches for the row with `"row_id"` to locate the new header row.
+    - The function searches for the row with `"row_id"` to locate the new header row (see `find_header_row`).
     - Rows and columns that are entirely NaN are dropped.
     """
-    # Identify the row number and column for where we want the new column names to be using "row_id" as a marker.
-    find_row_for_header = [
-        (index, column)
-        for index, row in df.iterrows()
-        for column, value in row.items()
-        if value == "row_id"
-    ]
-    # Pull out just the row number
-    row_number = find_row_for_header[0][0]
-    # Pull out the row with the new column names
-    header = df.iloc[row_number]
-    # Remove the rows above the new column names
-    df = df[row_number + 1 :]
-    # Rename the columns to the new header
-    df.columns = header
-    # Remove the columns and rows that are all NaN
-    df = remove_nan_rows_and_columns(df)
-    return df.reset_index(drop=True)
+    row_number = find_header_row(df)
+    if row_number is None:
+        raise ValueError('No "row_id" header row found in the CHPS table.')
+    return _set_header_row(df, row_number)
+
+
+def read_chps_csv(
+    path: Union[str, Path], marker: str = "row_id", chunksize: int = 1000
+) -> pd.DataFrame:
+    """
+    Read a raw CHPS CSV, detecting the header row while the file is parsed.
+
+    The file is parsed in chunks with every cell as text, and the header row is looked for
+    only until it is found, so the result is the same as `remove_extra_rows_and_columns_chps`
+    applied to the whole table without first parsing and scanning all of it.
+
+    Args:
+        path (Union[str, Path]): Path to the local CSV file.
+        marker (str): The value marking the header row. Defaults to "row_id".
+        chunksize (int): Number of lines parsed at a time. Defaults to 1000.
+
+    Returns:
+        pd.DataFrame: The table below the header row, with the header as column names.
+    """
+    chunks = []
+    with pd.read_csv(path, header=None, dtype=str, chunksize=chunksize) as reader:
+        for chunk in reader:
+            if not chunks:
+                row_number = find_header_row(chunk, marker)
+                if row_number is None:
+                    continue
+                # Keep the chunk from the header row onwards
+                chunk = chunk.iloc[row_number:]
+            chunks.append(chunk)
+    if not chunks:
+        raise ValueError(f'No "{marker}" header row found in {path}.')
+    return _set_header_row(pd.concat(chunks), 0)
+
+
+def load_chps_table(path: str, bucket: str = S3_BUCKET) -> pd.DataFrame:
+    """
+    Load a raw CHPS table from S3 (through the local S3 cache) with its header row detected.
+
+    Args:
+        path (str): S3 key of the raw CSV.
+        bucket (str): The S3 bucket. Defaults to S3_BUCKET.
+
+    Returns:
+        pd.DataFrame: The table below the header row, ready for `clean_chps(df, header_detected=True)`.
+    """
+    local_path = fetch_object(bucket, path)
+    try:
+        return read_chps_csv(local_path)
+    finally:
+        # Without the cache the local copy is a temporary file
+        if get_cache_settings()["mode"] == "off":
+            local_path.unlink(missing_ok=True)
 
 
 def keep_only_relevant_columns_chps_individual(df) -> pd.DataFrame:
@@ -134,7 +215,7 @@ def keep_only_relevant_columns_chps_simd(df) -> pd.DataFrame:
     return df
 
 
-def clean_chps(df, simd=False) -> pd.DataFrame:
+def clean_chps(df, simd=False, header_detected=False) -> pd.DataFrame:
     """
     Clean and preprocess the input DataFrame for the CHPS data.
 
@@ -155,6 +236,7 @@ def clean_chps(df, simd=False) -> pd.DataFrame:
     Args:
         df (pd.DataFrame): The input DataFrame containing CHPS data that requires cleaning.
         simd (bool): A flag indicating whether to retain SIMD-specific columns. Defaults to False.
+        header_detected (bool): Whether the header row has already been set, e.g. by `load_chps_table`. Defaults to False.
 
     Returns:
         pd.DataFrame: A cleaned DataFrame containing:
@@ -164,7 +246,10 @@ def clean_chps(df, simd=False) -> pd.DataFrame:
                         whitespace replaced by underscores.
     """
 
-    df_clean = remove_extra_rows_and_columns_chps(df)
+    if header_detected:
+        df_clean = df
+    else:
+        df_clean = remove_extra_rows_and_columns_chps(df)
     if simd == False:
         df_clean = keep_only_relevant_columns_chps_individual(df_clean)
     else:
@@ -175,42 +260,38 @@ def clean_chps(df, simd=False) -> pd.DataFrame:
     return df_clean
 
 
-def change_dtype(df, keep_suppression=False) -> pd.DataFrame:
+def infer_column_types(df) -> pd.DataFrame:
     """
-    Change the data type of columns in a DataFrame that contain the word 'number'.
+    Convert the text columns of a cleaned CHPS table that only hold numbers to numeric columns,
+    as they would be typed when the table is read back from a CSV.
 
-    This function searches for columns in the provided DataFrame that have
-    'number' in their column name. It then removes any commas from the
-    string representation of the numbers in these columns and converts
-    the cleaned data to integers.
-
-    Parameters:
-    -----------
-    df : pd.DataFrame
-        A pandas DataFrame that contains columns potentially labeled with
-        the word 'number'. The function modifies these columns in place.
+    Args:
+        df (pd.DataFrame): A cleaned CHPS table with text columns.
 
     Returns:
-    --------
-    pd.DataFrame
-        The modified DataFrame with the specified columns' data types
-        changed to integers.
+        pd.DataFrame: The table with numeric columns where every value is a number.
+    """
+    columns = {}
+    for col in df.columns[df.dtypes == object]:
+        numeric = pd.to_numeric(df[col], errors="coerce")
+        if numeric.notna().sum() == df[col].notna().sum():
+            columns[col] = numeric
+    return df.assign(**columns) if columns else df
 
-    Notes:
-    ------
-    - This function assumes that all entries in the relevant columns can
-      be safely converted to integers after removing commas. If any value
-      cannot be converted (e.g., due to non-numeric characters), a
-      ValueError will be raised.
-    - The original DataFrame is modified in place; thus, the changes
-      will be reflected in the input DataFrame `df`.
-    """
-    columns_containing_numbers = df.columns[df.columns.str.contains("number")]
-    for col in columns_containing_numbers:
-        df[col] = df[col].apply(lambda x: str(x).replace(",", ""))
-        if keep_suppression == True:
-            df[col] = df[col].apply(lambda x: int(x) if x != "<5" else x)
-        else:
-            df[col] = df[col].replace("<5", 5)
-            df[col] = df[col].astype(int)
-    return df
+
+def suppression_view(df, keep_suppression=False, suppressed_value=5) -> pd.DataFrame:
+    """
+    View a CHPS table with typed counts the way the processed getters return it.
+
+    Args:
+        df (pd.DataFrame): A CHPS table with typed counts and suppression masks (see `split_suppressed`).
+        keep_suppression (bool): If True, the suppressed values are shown as "<5" (in object columns),
+            if False, they are replaced by `suppressed_value`. Defaults to False.
+        suppressed_value (int): The value of the suppressed counts when they are not kept. Defaults to 5.
+
+    Returns:
+        pd.DataFrame: The table without the suppression masks.
+    """
+    if keep_suppression:
+        return render_suppressed(df, text="<5")
+    return fill_suppressed(df, value=suppressed_value)
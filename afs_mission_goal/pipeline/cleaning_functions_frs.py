@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional
+
+# Nullable integer types from the smallest to the largest
+_INTEGER_TYPES = ["Int8", "Int16", "Int32", "Int64"]
+
+
+def to_numeric_if_valid(values: pd.Series) -> Optional[pd.Series]:
+    """
+    Convert a column to numbers if every value in it is a number or missing.
+    Empty strings and "nan" strings count as missing values.
+    Args:
+        values (pd.Series): The column to convert.
+    Returns:
+        Optional[pd.Series]: The column as float64, or None if it holds any value that is not a number.
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return None
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    values = values.mask(values.isin(["", "nan"]))
+    numeric = pd.to_numeric(values, errors="coerce")
+    if numeric.notna().sum() != values.notna().sum():
+        return None
+    return numeric.astype("float64")
+
+
+def downcast_numeric(values: pd.Series) -> pd.Series:
+    """
+    Downcast a float64 column to the smallest type that holds every value exactly:
+    a nullable integer type if all the values are whole numbers, otherwise float32 if
+    every value survives the round trip, otherwise float64.
+    Args:
+        values (pd.Series): A float64 column.
+    Returns:
+        pd.Series: The downcast column.
+    """
+    array = values.to_numpy()
+    present = array[~np.isnan(array)]
+    if len(present) == 0:
+        return values
+    if np.isfinite(present).all() and (present == np.round(present)).all():
+        lowest, highest = present.min(), present.max()
+        for dtype in _INTEGER_TYPES:
+            info = np.iinfo(dtype.lower())
+            if info.min <= lowest and highest <= info.max:
+                return values.astype(dtype)
+    if np.array_equal(array.astype("float32").astype("float64"), array, equal_nan=True):
+        return values.astype("float32")
+    return values
+
+
+def coerce_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give every column of a dataframe that only holds numbers (or missing values) a numeric type,
+    downcast to the smallest type that holds the values exactly. Other columns are left as they are.
+    Args:
+        df (pd.DataFrame): The dataframe to type.
+    Returns:
+        pd.DataFrame: The dataframe with numeric columns.
+    """
+    columns = {}
+    for column in df.columns:
+        numeric = to_numeric_if_valid(df[column])
+        if numeric is not None:
+            columns[column] = downcast_numeric(numeric)
+    if not columns:
+        return df
+    return df.assign(**columns)
+
+
+def normalise_label(label: str) -> str:
+    """
+    Normalise a label the way the FRS variable labels are shown: capitalised and without surrounding spaces.
+    Args:
+        label (str): The label to normalise.
+    Returns:
+        str: The normalised label.
+    """
+    return label.capitalize().strip()
+
+
+def _as_number(code: Any) -> Optional[float]:
+    """The numeric value of a code, or None if it is not a number."""
+    try:
+        return float(code)
+    except (TypeError, ValueError):
+        return None
+
+
+def compile_label_mapping(labels: Dict[str, str]) -> Dict[str, dict]:
+    """
+    Precompile a dictionary of codes to labels so it can be applied to a column in one step.
+    The labels are normalised once, and every code is indexed both by its text and by its
+    numeric value, so it matches numeric columns whatever their type (e.g. "1" and "1.0" both match 1).
+    Args:
+        labels (Dict[str, str]): Dictionary of codes to labels, as loaded from the FRS variables dictionaries.
+    Returns:
+        Dict[str, dict]: The normalised labels keyed by code text ("by_text") and by numeric code ("by_number").
+    """
+    by_text = {str(code): normalise_label(str(label)) for code, label in labels.items()}
+    by_number = {}
+    # Codes written as in the old string form of float columns (e.g. "1.0") take precedence
+    for code in sorted(by_text, key=lambda code: str(_as_number(code)) == code):
+        number = _as_number(code)
+        if number is not None:
+            by_number[number] = by_text[code]
+    return {"by_text": by_text, "by_number": by_number}
+
+
+def _label_of(value: Any, mapping: Dict[str, dict], numeric: bool) -> str:
+    """The label of a single code, or the normalised code itself if it has no label."""
+    if numeric:
+        value = float(value)
+        return mapping["by_number"].get(value, normalise_label(str(value)))
+    return mapping["by_text"].get(str(value), normalise_label(str(value)))
+
+
+def map_codes_to_labels(values: pd.Series, mapping: Dict[str, dict]) -> pd.Series:
+    """
+    Replace the codes of a column by their labels, as a categorical.
+    Each distinct code is looked up once. Codes without a label are kept as normalised text
+    (numeric codes written as floats, e.g. "3.0"). Missing values, empty strings and "nan" strings stay missing.
+    Args:
+        values (pd.Series): Column of codes.
+        mapping (Dict[str, dict]): Label mapping from `compile_label_mapping`.
+    Returns:
+        pd.Series: Categorical column of labels.
+    """
+    numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(
+        values
+    )
+    if not numeric:
+        values = values.mask(values.isin(["", "nan"]))
+    codes, uniques = pd.factorize(values)
+    unique_labels = [_label_of(value, mapping, numeric) for value in uniques]
+    categories = pd.unique(pd.Series(unique_labels, dtype="object"))
+    positions = pd.Index(categories).get_indexer(unique_labels)
+    label_codes = (
+        np.where(codes >= 0, positions[codes], -1) if len(positions) else codes
+    )
+    return pd.Series(
+        pd.Categorical.from_codes(label_codes, categories=categories),
+        index=values.index,
+        name=values.name,
+    )
@@ -0,0 +1,137 @@
+"""
+Precomputes the rates of the CHPS counts and their Wilson confidence intervals.
+
+Every count of every processed CHPS table, year and review period is divided by the
+number of reviews of its row, and the rates and intervals are computed at once over
+the whole store of tables (see `afs_mission_goal/utils/chps_query.py`). The results are
+saved as a long cube, one row per table, index value, breakdown and count, so the
+reports only look rates up (see `get_chps_rates`).
+
+The denominator and confidence level are set in `config["chps_rates"]`. The rates of
+suppressed counts are missing, as are those of rows without any review.
+
+Usage:
+python -m afs_mission_goal.pipeline.compute_chps_rates
+"""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from afs_mission_goal import S3_BUCKET, chps_tables_config, config
+from afs_mission_goal.utils.chps_query import ALL, STORE_INDEX, build_chps_store
+from afs_mission_goal.utils.chps_registry import chps_years
+from afs_mission_goal.utils.parquet_storage import upload_parquet
+from afs_mission_goal.utils.suppression import SUPPRESSED_SUFFIX, count_columns
+
+logger = logging.getLogger(__name__)
+
+# Text columns of the tables that describe a row rather than break it down
+_DESCRIPTIVE_COLUMNS = ["year", "local_authority_name"]
+
+
+def wilson_interval(
+    successes: np.ndarray, totals: np.ndarray, confidence_level: float = 0.95
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilson score interval of proportions, for arrays of counts.
+
+    Args:
+        successes (np.ndarray): The numbers of successes.
+        totals (np.ndarray): The numbers of trials. The interval is missing where it is 0 or missing.
+        confidence_level (float): The confidence level of the interval. Defaults to 0.95.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The lower and upper bounds of the intervals.
+    """
+    successes = np.asarray(successes, dtype="float64")
+    totals = np.asarray(totals, dtype="float64")
+    totals = np.where(totals > 0, totals, np.nan)
+    z = stats.norm.ppf(1 - (1 - confidence_level) / 2)
+    proportions = successes / totals
+    centre = proportions + z**2 / (2 * totals)
+    margin = z * np.sqrt(
+        proportions * (1 - proportions) / totals + z**2 / (4 * totals**2)
+    )
+    scale = 1 + z**2 / totals
+    return (centre - margin) / scale, (centre + margin) / scale
+
+
+def _breakdowns(store: pd.DataFrame) -> pd.Series:
+    """The breakdown of every row of the store, from the text columns specific to its table (e.g. "Male").
+
+    Rows broken down by several columns have their values joined by " / ", and rows
+    without any breakdown have `ALL`.
+    """
+    columns = [
+        col
+        for col in store.columns[store.dtypes == object]
+        if col not in _DESCRIPTIVE_COLUMNS and col not in STORE_INDEX
+    ]
+    breakdowns = pd.Series(pd.NA, index=store.index, dtype="string")
+    for col in columns:
+        values = store[col].astype("string")
+        joined = breakdowns + " / " + values
+        breakdowns = joined.fillna(breakdowns).fillna(values)
+    return breakdowns.fillna(ALL)
+
+
+def compute_rates_cube(
+    store: pd.DataFrame, denominator: str, confidence_level: float = 0.95
+) -> pd.DataFrame:
+    """Compute the rates of every count of the store and their Wilson confidence intervals.
+
+    Args:
+        store (pd.DataFrame): The store of CHPS tables (see `build_chps_store`).
+        denominator (str): The count column the rates are a proportion of, e.g. "number_of_reviews".
+        confidence_level (float): The confidence level of the intervals. Defaults to 0.95.
+
+    Returns:
+        pd.DataFrame: One row per row of the store and count, with the keys of `STORE_INDEX`, the `breakdown`,
+            the `measure` (the count column), the `numerator` and `denominator`, whether the numerator is
+            `suppressed`, and the `rate`, `ci_lower` and `ci_upper`.
+    """
+    store = store.reset_index()
+    measures = [col for col in count_columns(store) if col != denominator]
+    keys = store[STORE_INDEX].assign(breakdown=_breakdowns(store))
+    n_rows, n_measures = len(store), len(measures)
+    # Flatten the counts into one column, measure by measure, to compute every rate at once
+    numerators = store[measures].to_numpy(dtype="float64", na_value=np.nan)
+    suppressed = (
+        store[[col + SUPPRESSED_SUFFIX for col in measures]]
+        .fillna(False)
+        .to_numpy(dtype=bool)
+    )
+    denominators = store[denominator].to_numpy(dtype="float64", na_value=np.nan)
+    cube = pd.DataFrame(
+        {
+            **{col: np.tile(keys[col].to_numpy(), n_measures) for col in keys},
+            "measure": np.repeat(measures, n_rows),
+            "numerator": numerators.ravel(order="F"),
+            "denominator": np.tile(denominators, n_measures),
+            "suppressed": suppressed.ravel(order="F"),
+        }
+    )
+    # Drop the counts of the other tables, which are missing without being suppressed
+    cube = cube[cube.numerator.notna() | cube.suppressed].reset_index(drop=True)
+    lower, upper = wilson_interval(cube.numerator, cube.denominator, confidence_level)
+    totals = cube.denominator.where(cube.denominator > 0)
+    return cube.assign(
+        numerator=cube.numerator.astype("Int64"),
+        denominator=cube.denominator.astype("Int64"),
+        rate=(cube.numerator / totals).astype("float32"),
+        ci_lower=lower.astype("float32"),
+        ci_upper=upper.astype("float32"),
+    )
+
+
+if __name__ == "__main__":
+    rates_config = config["chps_rates"]
+    store = build_chps_store(year=chps_years())
+    cube = compute_rates_cube(
+        store, rates_config["denominator"], rates_config["confidence_level"]
+    )
+    upload_parquet(cube, S3_BUCKET, chps_tables_config["rates_key"])
+    logger.info(f"Saved {len(cube)} CHPS rates to {chps_tables_config['rates_key']}")
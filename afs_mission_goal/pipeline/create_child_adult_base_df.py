@@ -1,24 +1,31 @@
 from afs_mission_goal.getters.uk_data_service.processed.family_resources_filtered import (
     get_filtered_datasets,
 )
-from nesta_ds_utils.loading_saving import S3
+from afs_mission_goal.utils.parquet_storage import save_processed_table
+from afs_mission_goal.utils.household_aggregation import (
+    align_to_households,
+    count_by_household,
+    household_codes,
+    household_index,
+)
+from afs_mission_goal.utils.cohorts import evaluate_cohorts, select_cohort
 import pandas as pd
-import numpy as np
 from typing import Dict, List
 from afs_mission_goal import DS_BUCKET
 
 
 def create_child_adult_base_df(
-    filtered_data: Dict[str, pd.DataFrame]
+    filtered_data: Dict[str, pd.DataFrame],
 ) -> List[pd.DataFrame]:
     """
     Function to create the base dataframe with the child and adult data.
     Returns:
-        pd.DataFrame: Base dataframe with the child and adult data.
+        List[pd.DataFrame]: Base dataframe with the child and adult data, the low income households
+            with children under 5, and the mask of every cohort of `config/cohorts.yaml` over the households.
     """
 
-    frs2223 = filtered_data["frs2223"]
     child_data = filtered_data["child"]
+    adult_data = filtered_data["adult"]
     household_data = filtered_data["household"]
 
     income_benefit = household_data[
@@ -29,42 +36,33 @@ def create_child_adult_base_df(
         ]
     ].drop_duplicates()
 
-    # Finding the number of children under 5
-    children_0_5 = child_data[child_data.age_of_child_last_birthday <= 5][
-        ["sernum", "age_of_child_last_birthday"]
-    ]
-    children_0_5 = (
-        children_0_5.groupby("sernum")
-        .count()
-        .reset_index()
-        .rename(columns={"age_of_child_last_birthday": "num_children_under_5"})
-    )
-
-    child_all = (
-        child_data[["sernum", "age_of_child_last_birthday"]]
-        .groupby("sernum")
-        .count()
-        .reset_index()
-        .rename(columns={"age_of_child_last_birthday": "num_children"})
+    # Code every table's households once, then count the people of each household with bincounts
+    households = household_index(
+        child_data.sernum, adult_data.sernum, income_benefit.sernum
     )
-
-    # Finding the number of adults
-    adults = (
-        filtered_data["adult"]
-        .sernum.value_counts()
-        .reset_index()
-        .sort_values(by="sernum")
-        .reset_index(drop=True)
-        .rename(columns={"count": "num_adults"})
+    child_codes = household_codes(households, child_data.sernum)
+    child_age = child_data.age_of_child_last_birthday
+    counts = pd.DataFrame(
+        {
+            "num_children": count_by_household(
+                child_codes, len(households), child_age.notna()
+            ),
+            # Finding the number of children under 5
+            "num_children_under_5": count_by_household(
+                child_codes, len(households), child_age <= 5
+            ),
+            # Finding the number of adults
+            "num_adults": count_by_household(
+                household_codes(households, adult_data.sernum), len(households)
+            ),
+        },
+        index=households,
     )
 
     # Creating the base dataframe with the number of children under 5, number of adults, income and benefits for each household
-    frs_base_df = (
-        children_0_5.merge(child_all, on="sernum", how="outer")
-        .merge(income_benefit, on="sernum", how="outer")
-        .merge(adults, on="sernum", how="outer")
-        .replace(np.nan, 0)
-    )[
+    frs_base_df = counts.join(
+        align_to_households(households, income_benefit)
+    ).reset_index()[
         [
             "sernum",
             "num_children",
@@ -75,14 +73,11 @@ def create_child_adult_base_df(
         ]
     ]
 
-    # Creating the low income households with children under 5 dataframe
-    # 409.2 is 60% of the median weekly income in the UK 2023
-    lowincome_0_5 = frs_base_df[
-        (frs_base_df.hh_total_household_income <= 409.2)
-        & (frs_base_df.num_children_under_5 > 0)
-    ].reset_index(drop=True)
+    # Evaluating every cohort of config/cohorts.yaml, including the low income households with children under 5
+    cohort_masks = evaluate_cohorts(frs_base_df, child_data)
+    lowincome_0_5 = select_cohort(frs_base_df, cohort_masks, "lowincome_0_5")
 
-    return [frs_base_df, lowincome_0_5]
+    return [frs_base_df, lowincome_0_5, cohort_masks]
 
 
 if __name__ == "__main__":
@@ -90,19 +85,23 @@ if __name__ == "__main__":
     filtered_data = get_filtered_datasets()
 
     print("Creating dataframes with the child and adult data")
-    base_df, lowincome_0_5 = create_child_adult_base_df(filtered_data)
+    base_df, lowincome_0_5, cohort_masks = create_child_adult_base_df(filtered_data)
 
     print("Uploading the dataframes to the S3 bucket")
-    S3.upload_obj(
+    save_processed_table(
         base_df,
         bucket=DS_BUCKET,
         path_to=f"data/processed/filtered_dataframes/base_df.csv",
-        kwargs_writing={"index": False},
     )
 
-    S3.upload_obj(
+    save_processed_table(
         lowincome_0_5,
         bucket=DS_BUCKET,
         path_to=f"data/processed/filtered_dataframes/lowincome_0_5.csv",
-        kwargs_writing={"index": False},
+    )
+
+    save_processed_table(
+        cohort_masks.reset_index(),
+        bucket=DS_BUCKET,
+        path_to="data/processed/filtered_dataframes/cohorts.csv",
     )
@@ -1,16 +1,23 @@
 from afs_mission_goal.getters.uk_data_service.raw.family_resources_survey import (
     get_raw_frs_data,
 )
-from afs_mission_goal.getters.uk_data_service.misc.get_frs_variables import (
-    get_frs_variables_dict,
+from afs_mission_goal.getters.uk_data_service.misc.get_frs_dictionary_index import (
+    get_frs_clean_labels,
+    get_frs_value_labels,
+)
+from afs_mission_goal.pipeline.cleaning_functions_frs import (
+    coerce_numeric_columns,
+    compile_label_mapping,
+    map_codes_to_labels,
 )
-from afs_mission_goal.utils.preprocessing import preprocess_strings
 from afs_mission_goal.utils.google_utils import access_google_sheet
 import numpy as np
 import pandas as pd
-from nesta_ds_utils.loading_saving import S3
+from afs_mission_goal.utils.parquet_storage import save_processed_table
+from afs_mission_goal.utils.bulk_load import load_concurrently, raise_for_errors
 from afs_mission_goal import config
-from typing import Dict
+from functools import partial
+from typing import Dict, List
 from afs_mission_goal import DS_BUCKET
 
 
@@ -20,6 +27,7 @@ def create_frs_dataframes(
     all_vars: pd.DataFrame,
     raw_frs_dict: Dict[str, pd.DataFrame],
     frs_variables: Dict[str, Dict[str, str]],
+    clean_labels: Dict[str, str],
 ) -> Dict[str, pd.DataFrame]:
     """
     Function to create the FRS dataframes with the variables of interest.
@@ -29,12 +37,23 @@ def create_frs_dataframes(
         all_vars (pd.DataFrame): DataFrame with the variables of interest taken from the google sheets.
         raw_frs_dict (Dict[pd.DataFrame]): Dictionary with the raw FRS dataframes.
         frs_variables (Dict[Dict[str,str]]): Dictionary with the values to replace in the FRS dataframes.
+        clean_labels (Dict[str,str]): The new name of each variable (upper case), see `get_frs_clean_labels`.
     Returns:
         Dict[pd.DataFrame]: Dictionary with the FRS dataframes.
     """
 
     dict_keys = dict(zip(frs_datasets, frs_original_names))
 
+    # Precompile the label dictionaries into mappings applied in one step per column
+    label_mappings = {
+        key: {
+            var_key.upper(): compile_label_mapping(labels)
+            for var_key, labels in frs_variables[key].items()
+        }
+        for key in all_vars.Dataset.unique().tolist()
+        if key in frs_variables.keys()
+    }
+
     frs_vars = {}
     for key in all_vars.Dataset.unique().tolist():
         if dict_keys[key] in raw_frs_dict.keys():
@@ -43,58 +62,59 @@ def create_frs_dataframes(
             cols_of_interest = ["SERNUM"] + all_vars[
                 all_vars.Dataset == key
             ].Original.tolist()
-            raw_data = raw_data[cols_of_interest]
-            frs_vars[key] = raw_data.replace(np.nan, "").replace("nan", "")
-
-    # Convert all numeric columns to floats
-    for key in frs_vars.keys():
-        for column in frs_vars[key].columns:
-            try:
-                frs_vars[key][column] = pd.Series(frs_vars[key][column], dtype="float")
-            except:
-                continue
-
-    dictionary = raw_frs_dict["dictnary"][["VARIABLE", "LABEL"]].copy()
-    dictionary["VARIABLE"] = dictionary["VARIABLE"].str.upper()
-    dictionary["LABEL"] = preprocess_strings(dictionary["LABEL"])
-    dictionary_dict = dictionary.set_index("VARIABLE")["LABEL"].to_dict()
+            # Convert all numeric columns to numbers, downcast where no value changes
+            frs_vars[key] = coerce_numeric_columns(raw_data[cols_of_interest])
 
     frs_vars_final = frs_vars.copy()
 
     for key in frs_vars_final.keys():
-        if key in frs_variables.keys():
-            frs_variables[key] = {
-                var_key.upper(): value for var_key, value in frs_variables[key].items()
+        if key in label_mappings.keys():
+            labelled = {
+                vars: map_codes_to_labels(frs_vars_final[key][vars], mapping)
+                for vars, mapping in label_mappings[key].items()
+                if vars in frs_vars_final[key].columns
             }
-
-            for vars in frs_variables[key].keys():
-                if vars in frs_vars_final[key].columns:
-                    frs_vars_final[key][vars] = (
-                        pd.Series(frs_vars_final[key][vars], dtype="string")
-                        .replace(frs_variables[key][vars])
-                        .str.capitalize()
-                        .str.strip()
-                    )
-            frs_vars_final[key] = frs_vars_final[key].rename(columns=dictionary_dict)
+            frs_vars_final[key] = frs_vars_final[key].assign(**labelled)
+            frs_vars_final[key] = frs_vars_final[key].rename(columns=clean_labels)
 
     return frs_vars_final
 
 
+def raw_columns_of_interest(
+    frs_datasets: list, frs_original_names: list, *variable_sets: pd.DataFrame
+) -> Dict[str, List[str]]:
+    """
+    Function to find the raw FRS datasets and columns referenced by one or more sets of variables of interest.
+    Args:
+        frs_datasets (list): List of the wanted FRS dataset names.
+        frs_original_names (list): List of the original FRS dataset names.
+        variable_sets (pd.DataFrame): DataFrames with the variables of interest taken from the google sheets.
+    Returns:
+        Dict[str, List[str]]: Dictionary with the columns to load from each referenced raw dataset.
+    """
+    dict_keys = dict(zip(frs_datasets, frs_original_names))
+    columns_of_interest = {}
+    for variables in variable_sets:
+        for key in variables.Dataset.unique():
+            columns_of_interest.setdefault(dict_keys[key], ["SERNUM"]).extend(
+                variables[variables.Dataset == key].Original.tolist()
+            )
+    columns_of_interest = {
+        dataset: list(dict.fromkeys(columns))
+        for dataset, columns in columns_of_interest.items()
+    }
+    return columns_of_interest
+
+
 if __name__ == "__main__":
     # Get the dataset names and the original names
     frs_datasets = config["frs_datasets"]
     frs_original_names = config["frs_original_names"]
-    dict_keys = dict(zip(frs_datasets, frs_original_names))
 
-    # Get the raw data with the original names
-    print("Getting the raw data")
-    raw_frs_dict = {}
-    for names, dataset in zip(frs_datasets, frs_original_names):
-        raw_frs_dict[dataset] = get_raw_frs_data(dataset)
-
-    # Get the longer form variables
+    # Get the longer form variables and the new column names from the index of the FRS variables
     print("Getting the variables")
-    frs_variables = get_frs_variables_dict()
+    frs_variables = get_frs_value_labels()
+    clean_labels = get_frs_clean_labels()
 
     # Load the google sheets with the variables of interest
     print("Getting the google sheets")
@@ -112,15 +132,6 @@ if __name__ == "__main__":
     demographics = access_google_sheet(
         "1Ld3TYH-8YOSBL9K-BlOnd7JELDZGtdkk77F-l75Tlqc", "Demographics", row_names=False
     )
-    financial_planning = access_google_sheet(
-        "1Ld3TYH-8YOSBL9K-BlOnd7JELDZGtdkk77F-l75Tlqc",
-        "Financial_Planning",
-        row_names=False,
-    )
-
-    average_stats = access_google_sheet(
-        "1Ld3TYH-8YOSBL9K-BlOnd7JELDZGtdkk77F-l75Tlqc", "Average_Stats", row_names=False
-    )
 
     # Combine the google sheets into one
     all_vars = (
@@ -137,19 +148,50 @@ if __name__ == "__main__":
         .drop_duplicates(subset=["Original"], keep="first")
         .reset_index(drop=True)
     )
-    # Create the FRS dataframes
-    print("Creating the FRS dataframes")
-    frs_vars_final = create_frs_dataframes(
-        frs_datasets, frs_original_names, all_vars, raw_frs_dict, frs_variables
+    # The demographic variables on their own
+    demographic_vars = (
+        demographics[demographics.Original != "SERNUM"]
+        .replace("", np.nan)
+        .dropna(subset=["Original", "Dataset"])
+        .drop_duplicates(subset=["Original"], keep="first")
     )
 
-    # Save the dataframes
-    print("Saving the dataframes")
-    print(frs_vars_final.keys())
-    for key in frs_vars_final.keys():
-        S3.upload_obj(
-            frs_vars_final[key],
-            bucket=DS_BUCKET,
-            path_to=f"data/processed/filtered_dataframes/{key}_df.csv",
-            kwargs_writing={"index": False},
+    # Get the raw data with the original names, loading each referenced dataset once
+    # with only the columns needed for both sets of dataframes
+    print("Getting the raw data")
+    columns_of_interest = raw_columns_of_interest(
+        frs_datasets, frs_original_names, all_vars, demographic_vars
+    )
+    raw_frs_dict, errors = load_concurrently(
+        {
+            dataset: partial(get_raw_frs_data, dataset, columns=columns)
+            for dataset, columns in columns_of_interest.items()
+        }
+    )
+    raise_for_errors(errors, "raw FRS dataset")
+
+    # Create the FRS dataframes
+    print("Creating the FRS dataframes")
+    outputs = {
+        "data/processed/filtered_dataframes": all_vars,
+        "data/processed/filtered_dataframes/demographic": demographic_vars,
+    }
+    for directory, variables in outputs.items():
+        frs_vars_final = create_frs_dataframes(
+            frs_datasets,
+            frs_original_names,
+            variables,
+            raw_frs_dict,
+            frs_variables,
+            clean_labels,
         )
+
+        # Save the dataframes
+        print(f"Saving the dataframes to {directory}")
+        print(frs_vars_final.keys())
+        for key in frs_vars_final.keys():
+            save_processed_table(
+                frs_vars_final[key],
+                bucket=DS_BUCKET,
+                path_to=f"{directory}/{key}_df.csv",
+            )
@@ -0,0 +1,373 @@
+"""
+Runs the pipeline scripts as a DAG.
+
+Each stage declares the S3 objects it reads and writes. A stage depends on every
+stage that writes one of its inputs, and independent stages run in parallel, each
+in its own process (`python -m <module>`). Before a stage runs, its inputs are
+fingerprinted by their ETags; a stage whose inputs have not changed since its last
+successful run is skipped.
+
+Keys ending in "*" are prefixes covering every object under them, so the Parquet
+and CSV copies of a table are declared together as e.g. ".../base_df.*".
+
+Usage:
+python -m afs_mission_goal.pipeline.run_pipeline
+python -m afs_mission_goal.pipeline.run_pipeline --stages clean_chps_tables --force
+python -m afs_mission_goal.pipeline.run_pipeline --dry-run
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from afs_mission_goal import DS_BUCKET, S3_BUCKET, chps_tables_config, config
+from afs_mission_goal.getters.uk_data_service.misc.get_frs_dictionary_index import (
+    frs_dictionary_index_path,
+)
+from afs_mission_goal.utils.chps_registry import chps_years, output_key, raw_key
+from afs_mission_goal.utils.parquet_storage import to_parquet_path
+from afs_mission_goal.utils.completion_markers import (
+    FORCE_ENVIRONMENT_VARIABLE,
+    is_complete,
+    object_fingerprint,
+    write_marker,
+)
+
+logger = logging.getLogger(__name__)
+
+FRS_VARIABLES_SHEET_ID = "1Ld3TYH-8YOSBL9K-BlOnd7JELDZGtdkk77F-l75Tlqc"
+
+STAGES = [
+    {
+        "name": "clean_chps_tables",
+        "module": "afs_mission_goal.pipeline.clean_chps_tables",
+        "inputs": [
+            (S3_BUCKET, raw_key(name, year))
+            for name in chps_tables_config["tables"]
+            for year in chps_years()
+        ],
+        "outputs": [
+            (S3_BUCKET, to_parquet_path(output_key(name)))
+            for name in chps_tables_config["tables"]
+        ]
+        + [(S3_BUCKET, output_key(name)) for name in chps_tables_config["tables"]]
+        + [(S3_BUCKET, chps_tables_config["partitioned_prefix"])],
+    },
+    {
+        "name": "compute_chps_rates",
+        "module": "afs_mission_goal.pipeline.compute_chps_rates",
+        "inputs": [(S3_BUCKET, chps_tables_config["partitioned_prefix"])],
+        "outputs": [(S3_BUCKET, chps_tables_config["rates_key"])],
+    },
+    {
+        "name": "build_council_area_geometry",
+        "module": "afs_mission_goal.pipeline.build_council_area_geometry",
+        "inputs": [
+            (DS_BUCKET, "data/" + config["council_area_geometry"]["source"]),
+            (S3_BUCKET, output_key("lookup")),
+        ],
+        "outputs": [(S3_BUCKET, config["council_area_geometry"]["path"])],
+    },
+    {
+        "name": "build_frs_dictionary_index",
+        "module": "afs_mission_goal.pipeline.build_frs_dictionary_index",
+        "inputs": [
+            (DS_BUCKET, "data/raw/family_resources_survey/2022/dictnary.dta"),
+            (DS_BUCKET, "data/aux/frs.json"),
+            (DS_BUCKET, "data/aux/frs_variables/"),
+        ],
+        "outputs": [(DS_BUCKET, frs_dictionary_index_path())],
+    },
+    {
+        "name": "clean_family_resources_survey",
+        "module": "afs_mission_goal.pipeline.clean_family_resources_survey",
+        "inputs": [
+            (DS_BUCKET, "data/raw/family_resources_survey/2022/"),
+            (DS_BUCKET, frs_dictionary_index_path()),
+        ],
+        "outputs": [(DS_BUCKET, "data/processed/family_resources_survey_*")],
+    },
+    {
+        "name": "clean_wealth_and_assets_survey",
+        "module": "afs_mission_goal.pipeline.clean_wealth_and_assets_survey",
+        "inputs": [
+            (DS_BUCKET, "data/raw/wealth_and_assets_survey/"),
+            (DS_BUCKET, "data/aux/wealth_and_assets_survey_dict.json"),
+        ],
+        "outputs": [(DS_BUCKET, "data/processed/wealth_and_assets_survey_*")],
+    },
+    {
+        "name": "create_frs_variables",
+        "module": "afs_mission_goal.pipeline.create_frs_variables",
+        "inputs": [
+            (DS_BUCKET, "data/raw/family_resources_survey/2022/"),
+            (DS_BUCKET, frs_dictionary_index_path()),
+        ],
+        "sheets": (
+            FRS_VARIABLES_SHEET_ID,
+            ["Incomings", "Outgoings", "Financial_Planning", "Demographics"],
+        ),
+        "outputs": [
+            (DS_BUCKET, f"data/processed/filtered_dataframes/{dataset}_df.*")
+            for dataset in config["frs_datasets"]
+        ]
+        + [(DS_BUCKET, "data/processed/filtered_dataframes/demographic/")],
+    },
+    {
+        "name": "create_child_adult_base_df",
+        "module": "afs_mission_goal.pipeline.create_child_adult_base_df",
+        "inputs": [
+            (DS_BUCKET, f"data/processed/filtered_dataframes/{dataset}_df.*")
+            for dataset in config["frs_datasets"]
+        ],
+        "outputs": [
+            (DS_BUCKET, "data/processed/filtered_dataframes/base_df.*"),
+            (DS_BUCKET, "data/processed/filtered_dataframes/lowincome_0_5.*"),
+            (DS_BUCKET, "data/processed/filtered_dataframes/cohorts.*"),
+        ],
+    },
+    {
+        "name": "build_household_wide_table",
+        "module": "afs_mission_goal.pipeline.build_household_wide_table",
+        "inputs": [
+            (DS_BUCKET, f"data/processed/filtered_dataframes/{dataset}_df.*")
+            for dataset in ["adult", "child", "benefit_unit", "household"]
+        ],
+        "outputs": [
+            (DS_BUCKET, config["household_wide_table"]["path"]),
+            (DS_BUCKET, config["household_wide_table"]["offsets_path"]),
+        ],
+    },
+]
+
+
+def _is_prefix(key: str) -> bool:
+    """Whether a declared key covers every object under it."""
+    return key.endswith("*") or key.endswith("/")
+
+
+def _overlaps(output: Tuple[str, str], input_: Tuple[str, str]) -> bool:
+    """Whether a stage output can be (part of) another stage's input."""
+    if output[0] != input_[0]:
+        return False
+    output_key, input_key = output[1].rstrip("*"), input_[1].rstrip("*")
+    if _is_prefix(output[1]) and input_key.startswith(output_key):
+        return True
+    if _is_prefix(input_[1]) and output_key.startswith(input_key):
+        return True
+    return output_key == input_key
+
+
+def stage_dependencies(stages: List[dict]) -> Dict[str, List[str]]:
+    """Find the stages each stage depends on from their declared inputs and outputs.
+
+    Args:
+        stages (List[dict]): The stage declarations.
+
+    Returns:
+        Dict[str, List[str]]: The names of the upstream stages of every stage.
+    """
+    dependencies = {}
+    for stage in stages:
+        dependencies[stage["name"]] = [
+            upstream["name"]
+            for upstream in stages
+            if upstream["name"] != stage["name"]
+            and any(
+                _overlaps(output, input_)
+                for output in upstream["outputs"]
+                for input_ in stage["inputs"]
+            )
+        ]
+    return dependencies
+
+
+def _sheets_fingerprint(sheet_id: str, sheet_names: List[str]) -> str:
+    """Fingerprint the content of Google Sheets that a stage reads."""
+    # Imported here so the runner only needs Google credentials for stages that use sheets
+    from afs_mission_goal.utils.google_utils import access_google_sheet
+
+    digest = hashlib.sha256()
+    for sheet_name in sheet_names:
+        sheet = access_google_sheet(sheet_id, sheet_name, row_names=False)
+        digest.update(sheet.to_csv(index=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def stage_fingerprint(stage: dict) -> str:
+    """Fingerprint the current inputs of a stage (S3 objects and Google Sheets).
+
+    Args:
+        stage (dict): The stage declaration.
+
+    Returns:
+        str: A hash that changes whenever any of the inputs changes.
+    """
+    digest = hashlib.sha256()
+    for bucket in sorted({bucket for bucket, _ in stage["inputs"]}):
+        keys = [key for b, key in stage["inputs"] if b == bucket]
+        digest.update(object_fingerprint(bucket, keys).encode("utf-8"))
+    if "sheets" in stage:
+        digest.update(_sheets_fingerprint(*stage["sheets"]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _marker_name(stage: dict) -> str:
+    """Name of the completion marker of a stage."""
+    return f"run_pipeline/{stage['name']}"
+
+
+def _run_stage(stage: dict, force: bool = False) -> None:
+    """Run the module of a stage in its own process, telling it to ignore its own markers if forced."""
+    logger.info(f"Running {stage['name']}")
+    env = dict(os.environ)
+    if force:
+        env[FORCE_ENVIRONMENT_VARIABLE] = "1"
+    subprocess.run([sys.executable, "-m", stage["module"]], check=True, env=env)
+    logger.info(f"Finished {stage['name']}")
+
+
+def run_pipeline(
+    stage_names: Optional[List[str]] = None,
+    force: bool = False,
+    max_workers: int = 4,
+    dry_run: bool = False,
+) -> Dict[str, str]:
+    """Run the pipeline stages in dependency order, running independent stages in parallel.
+
+    Args:
+        stage_names (List[str], optional): Only run these stages (their upstream stages are not added).
+            Defaults to all stages.
+        force (bool): Whether to run stages even if their inputs are unchanged, including the jobs
+            within a stage that keep their own markers. Defaults to False.
+        max_workers (int): Maximum number of stages running at the same time. Defaults to 4.
+        dry_run (bool): Whether to only log which stages would run. The stages downstream of a stage
+            that would run are "pending upstream", as their inputs would change. Defaults to False.
+
+    Raises:
+        RuntimeError: If any stage failed, or if some stages can never run because they depend
+            on each other. Stages downstream of a failed stage are not run.
+
+    Returns:
+        Dict[str, str]: The status of every stage: "done", "skipped", "would run", "pending upstream",
+            "failed" or "blocked".
+    """
+    stages = {stage["name"]: stage for stage in STAGES}
+    selected = stage_names or list(stages)
+    unknown = set(selected) - set(stages)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+    dependencies = {
+        name: [upstream for upstream in upstreams if upstream in selected]
+        for name, upstreams in stage_dependencies(list(stages.values())).items()
+        if name in selected
+    }
+
+    status = {}
+    running = {}
+    fingerprints = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(status) < len(selected):
+            n_finished = len(status)
+            for name in selected:
+                if name in status or name in running.values():
+                    continue
+                upstream_status = [status.get(up) for up in dependencies[name]]
+                if any(s in ("failed", "blocked") for s in upstream_status):
+                    logger.warning(f"Not running {name}, an upstream stage failed")
+                    status[name] = "blocked"
+                    continue
+                if any(s is None for s in upstream_status):
+                    continue
+                if any(s in ("would run", "pending upstream") for s in upstream_status):
+                    # The inputs are not rebuilt in a dry run, so they cannot be fingerprinted yet
+                    logger.info(
+                        f"{name} would run if an upstream stage changes its inputs"
+                    )
+                    status[name] = "pending upstream"
+                    continue
+                # The inputs are fingerprinted once the upstream stages have finished
+                stage = stages[name]
+                fingerprint = stage_fingerprint(stage)
+                marker_bucket = stage["outputs"][0][0]
+                if not force and is_complete(
+                    marker_bucket, _marker_name(stage), fingerprint
+                ):
+                    logger.info(f"Skipping {name}, its inputs are unchanged")
+                    status[name] = "skipped"
+                    continue
+                if dry_run:
+                    logger.info(f"Would run {name}")
+                    status[name] = "would run"
+                    continue
+                fingerprints[name] = fingerprint
+                running[executor.submit(_run_stage, stage, force)] = name
+            if not running:
+                if len(status) == n_finished:
+                    # No stage is running and none could start, e.g. stages depending on each other
+                    stuck = [name for name in selected if name not in status]
+                    raise RuntimeError(
+                        f"Pipeline stages cannot be scheduled, check their inputs for a cycle: {', '.join(stuck)}"
+                    )
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                stage = stages[name]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Stage {name} failed: {e!r}")
+                    status[name] = "failed"
+                    continue
+                write_marker(
+                    stage["outputs"][0][0],
+                    _marker_name(stage),
+                    fingerprints.pop(name),
+                )
+                status[name] = "done"
+
+    failed = [name for name, s in status.items() if s == "failed"]
+    if failed:
+        raise RuntimeError(f"Pipeline stages failed: {', '.join(failed)}")
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline stages as a DAG.")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        default=None,
+        help="Only run these stages.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run the stages even if their inputs are unchanged.",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=4,
+        help="Maximum number of stages running at the same time.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only show which stages would run.",
+    )
+    args = parser.parse_args()
+    status = run_pipeline(
+        stage_names=args.stages,
+        force=args.force,
+        max_workers=args.max_workers,
+        dry_run=args.dry_run,
+    )
+    for name, stage_status in status.items():
+        logger.info(f"{name}: {stage_status}")
@@ -0,0 +1,88 @@
+"""
+Concurrent loading of many objects from S3.
+
+Loading from S3 is I/O bound, so loading the datasets in a thread pool takes about
+as long as the slowest object rather than the sum of all of them. All threads share
+the pooled S3 client in `afs_mission_goal.utils.s3_cache`.
+
+Usage:
+from afs_mission_goal.utils.bulk_load import load_concurrently
+
+datasets, errors = load_concurrently(
+    {name: partial(get_individual_dataset, name) for name in ["adult", "child"]}
+)
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from afs_mission_goal import config
+from afs_mission_goal.utils.s3_cache import is_missing_object
+
+logger = logging.getLogger(__name__)
+
+
+def load_concurrently(
+    loaders: Dict[str, Callable[[], Any]], max_workers: Optional[int] = None
+) -> Tuple[Dict[str, Any], Dict[str, Exception]]:
+    """Run a set of loading functions concurrently, collecting the results and errors of each one.
+
+    Args:
+        loaders (Dict[str, Callable[[], Any]]): Dictionary of names to functions that take no arguments and load one object.
+        max_workers (int, optional): Number of objects loaded at the same time. Defaults to
+            `config["bulk_loading"]["max_workers"]`.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, Exception]]: The loaded objects and the errors raised, both keyed by name
+            and in the order of `loaders`.
+    """
+    if max_workers is None:
+        max_workers = config.get("bulk_loading", {}).get("max_workers", 8)
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(loader): name for name, loader in loaders.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+    order = list(loaders)
+    results = {name: results[name] for name in order if name in results}
+    errors = {name: errors[name] for name in order if name in errors}
+    return results, errors
+
+
+def raise_for_errors(errors: Dict[str, Exception], description: str) -> None:
+    """Log every error of a bulk load and raise a single error summarising them.
+
+    Args:
+        errors (Dict[str, Exception]): The errors returned by `load_concurrently`.
+        description (str): What was being loaded, used in the messages (e.g. "FRS dataset").
+
+    Raises:
+        RuntimeError: If there is any error.
+    """
+    for name, error in errors.items():
+        logger.error(f"Failed to load {description} {name}: {error!r}")
+    if errors:
+        raise RuntimeError(
+            f"Failed to load {len(errors)} {description}(s): {', '.join(errors)}"
+        ) from next(iter(errors.values()))
+
+
+def split_missing(
+    errors: Dict[str, Exception],
+) -> Tuple[Dict[str, Exception], Dict[str, Exception]]:
+    """Split the errors of a bulk load into objects that do not exist and other failures.
+
+    Args:
+        errors (Dict[str, Exception]): The errors returned by `load_concurrently`.
+
+    Returns:
+        Tuple[Dict[str, Exception], Dict[str, Exception]]: The errors for missing objects and the other errors.
+    """
+    missing = {name: e for name, e in errors.items() if is_missing_object(e)}
+    others = {name: e for name, e in errors.items() if name not in missing}
+    return missing, others
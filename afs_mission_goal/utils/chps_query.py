@@ -0,0 +1,231 @@
+"""
+In-memory store of the processed CHPS tables, to query cross-breakdowns without re-reading or re-filtering them.
+
+The tables are loaded once, concurrently, stacked into one frame and indexed by
+`STORE_INDEX`, a sorted MultiIndex, so a slice is a lookup in the index rather than a
+scan of every row. The index values are text, and a table without one of the index
+columns (e.g. the tables that are not by local authority) has `ALL` in that level.
+The `year` column of the tables is the financial year of the reviews, so the tables
+are indexed by their `publication_year`.
+
+Usage:
+from afs_mission_goal.utils.chps_query import load_chps_store, query_chps, aggregate_chps
+
+store = load_chps_store()
+query_chps(store, table="simd_la_developmental_breakdown", simd_quintile=[1, 2], local_authority_code="S12000033")
+aggregate_chps(store, by=["table", "simd_quintile"], review_period="27-30 months")
+"""
+
+import logging
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from afs_mission_goal import chps_tables_config
+from afs_mission_goal.getters.chps.processed.get_chps_table import get_chps_table
+from afs_mission_goal.utils.bulk_load import load_concurrently, raise_for_errors
+from afs_mission_goal.utils.chps_registry import (
+    Years,
+    output_table,
+    resolve_chps_years,
+)
+from afs_mission_goal.utils.suppression import (
+    SUPPRESSED_SUFFIX,
+    count_columns,
+    mask_columns,
+)
+
+logger = logging.getLogger(__name__)
+
+STORE_INDEX = [
+    "table",
+    "publication_year",
+    "review_period",
+    "simd_quintile",
+    "local_authority_code",
+]
+
+# Index value of a table without the index column
+ALL = "all"
+
+# Stores already loaded, keyed by their tables and years
+_stores: Dict[Tuple[Tuple[str, ...], Tuple[int, ...]], pd.DataFrame] = {}
+
+
+def chps_store_tables() -> List[str]:
+    """The processed CHPS tables that can be queried: every table in the registry but the lookup."""
+    tables = chps_tables_config["tables"]
+    return [
+        output_table(name)
+        for name, table in tables.items()
+        if table["mode"] != "lookup"
+    ]
+
+
+def _as_level(values: pd.Series) -> pd.Series:
+    """Convert the values of an index column to text, with whole numbers without decimals (e.g. "1", not "1.0")."""
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        numeric = values.astype("Float64")
+        if (numeric.dropna() % 1 == 0).all():
+            values = numeric.astype("Int64")
+    return values.astype("string").fillna(ALL).astype(str)
+
+
+def _as_key(value):
+    """Convert a query value, or a list of them, to the text of the index."""
+    if isinstance(value, (list, tuple, set, range, pd.Index)):
+        return sorted({_as_key(v) for v in value})
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _as_keys(value) -> List[str]:
+    """Convert a query value, or a list of them, to a list of texts of the index."""
+    key = _as_key(value)
+    return key if isinstance(key, list) else [key]
+
+
+def build_chps_store(
+    tables: Optional[List[str]] = None,
+    year: Years = None,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Load processed CHPS tables concurrently into one frame indexed by `STORE_INDEX`.
+
+    Args:
+        tables (List[str], optional): Names of the processed tables, e.g. "simd_la_developmental_breakdown".
+            Defaults to every table in `chps_store_tables`.
+        year (Union[int, Iterable[int]], optional): A publication year or several. Defaults to the latest year.
+        max_workers (int, optional): Number of tables loaded at the same time.
+            Defaults to `config["bulk_loading"]["max_workers"]`.
+
+    Returns:
+        pd.DataFrame: The tables stacked, with typed counts and suppression masks, and a sorted MultiIndex.
+    """
+    tables = tables or chps_store_tables()
+    years = resolve_chps_years(year)
+    frames, errors = load_concurrently(
+        {table: partial(get_chps_table, table, years) for table in tables},
+        max_workers=max_workers,
+    )
+    raise_for_errors(errors, "CHPS table")
+    store = pd.concat(
+        [df.assign(table=table) for table, df in frames.items()], ignore_index=True
+    )
+    levels = {
+        col: _as_level(store[col]) if col in store else ALL for col in STORE_INDEX
+    }
+    # The masks of the columns of other tables are missing, not suppressed
+    masks = {
+        mask: store[mask].astype("boolean").fillna(False).astype(bool)
+        for mask in mask_columns(store)
+    }
+    store = store.assign(**levels, **masks).set_index(STORE_INDEX).sort_index()
+    logger.info(f"Loaded {len(store)} rows of {len(tables)} CHPS tables into the store")
+    return store
+
+
+def load_chps_store(
+    tables: Optional[List[str]] = None, year: Years = None, reload: bool = False
+) -> pd.DataFrame:
+    """The store of processed CHPS tables (see `build_chps_store`), only built the first time it is requested.
+
+    Args:
+        tables (List[str], optional): Names of the processed tables. Defaults to every table in `chps_store_tables`.
+        year (Union[int, Iterable[int]], optional): A publication year or several. Defaults to the latest year.
+        reload (bool): Whether to build the store again, e.g. after the tables are updated. Defaults to False.
+
+    Returns:
+        pd.DataFrame: A copy of the store, so editing it does not change what later calls return.
+    """
+    key = (
+        tuple(sorted(tables or chps_store_tables())),
+        tuple(resolve_chps_years(year)),
+    )
+    if reload or key not in _stores:
+        _stores[key] = build_chps_store(list(key[0]), list(key[1]))
+    return _stores[key].copy()
+
+
+def query_chps(
+    store: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    dropna: bool = True,
+    **filters,
+) -> pd.DataFrame:
+    """Slice the store by its index levels.
+
+    Args:
+        store (pd.DataFrame): The store (see `load_chps_store`).
+        columns (List[str], optional): The columns to return. Defaults to every column.
+        dropna (bool): Whether to drop the columns without any value in the slice, i.e. those of other tables.
+            Defaults to True.
+        **filters: A value, or a list of values, for any level of `STORE_INDEX`,
+            e.g. `table="sex_counts_of_concerns", simd_quintile=[1, 2]`.
+
+    Raises:
+        ValueError: If a filter is not a level of `STORE_INDEX`.
+
+    Returns:
+        pd.DataFrame: The rows of the slice.
+    """
+    unknown = set(filters) - set(STORE_INDEX)
+    if unknown:
+        raise ValueError(
+            f"Unknown CHPS store levels {sorted(unknown)}, the levels are {STORE_INDEX}."
+        )
+    # Lists of values, so the slice is a frame even when every level is filtered
+    key = tuple(
+        _as_keys(filters[level]) if level in filters else slice(None)
+        for level in STORE_INDEX
+    )
+    rows = store.loc[key, columns if columns is not None else slice(None)]
+    if not dropna:
+        return rows
+    # A column without values is only empty if its values are not all suppressed
+    empty = [
+        col
+        for col in rows.columns[rows.isna().all()]
+        if not (col + SUPPRESSED_SUFFIX in rows and rows[col + SUPPRESSED_SUFFIX].any())
+    ]
+    rows = rows.drop(columns=empty)
+    # Also drop the masks of the counts that were dropped
+    orphans = [
+        mask
+        for mask in mask_columns(rows)
+        if mask[: -len(SUPPRESSED_SUFFIX)] not in rows
+    ]
+    return rows.drop(columns=orphans)
+
+
+def aggregate_chps(store: pd.DataFrame, by: List[str], **filters) -> pd.DataFrame:
+    """Sum the counts of a slice of the store by some of its index levels.
+
+    A total is marked as suppressed if any of the counts summed is suppressed,
+    as it is then a lower bound of the real total.
+
+    Args:
+        store (pd.DataFrame): The store (see `load_chps_store`).
+        by (List[str]): The levels of `STORE_INDEX` to group by, e.g. ["table", "simd_quintile"].
+        **filters: The slice to aggregate (see `query_chps`).
+
+    Returns:
+        pd.DataFrame: The summed counts, each followed by its suppression mask.
+    """
+    rows = query_chps(store, **filters)
+    counts = list(count_columns(rows))
+    masks = [
+        col for col in mask_columns(rows) if col[: -len(SUPPRESSED_SUFFIX)] in counts
+    ]
+    aggregations = {col: "sum" for col in counts}
+    aggregations.update({mask: "any" for mask in masks})
+    totals = rows[counts + masks].groupby(level=by).agg(aggregations)
+    order = []
+    for col in counts:
+        order.append(col)
+        if col + SUPPRESSED_SUFFIX in masks:
+            order.append(col + SUPPRESSED_SUFFIX)
+    return totals[order]
@@ -0,0 +1,83 @@
+"""
+S3 keys of the CHPS tables described in `config/chps_tables.yaml`.
+
+The raw tables are published once a year. Every year of a cleaned table is stored
+in a partitioned dataset, one Parquet file per year and table:
+`{partitioned_prefix}year=YYYY/table=<table>/<table>.parquet`, where `<table>` is the
+name of the processed table (e.g. "simd_sex_developmental_breakdown"). Reading a
+range of years only downloads the partitions of those years.
+
+The CHPS data already has a `year` column (the financial year of the reviews), so
+the publication year is stored in a `publication_year` column.
+"""
+
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+from afs_mission_goal import chps_tables_config
+
+Years = Union[int, Iterable[int], None]
+
+
+def chps_years() -> List[int]:
+    """The publication years of the CHPS data that are ingested, in order."""
+    return sorted(chps_tables_config["years"])
+
+
+def resolve_chps_years(year: Years = None) -> List[int]:
+    """Convert a year, a range or list of years, or None (the latest year) into a sorted list of years.
+
+    Args:
+        year (Union[int, Iterable[int]], optional): A year (e.g. 2024), or several years (e.g. range(2022, 2025)).
+            Defaults to the latest year.
+
+    Raises:
+        ValueError: If any year is not in `config/chps_tables.yaml`.
+
+    Returns:
+        List[int]: The years.
+    """
+    if year is None:
+        return chps_years()[-1:]
+    years = sorted({int(year)} if isinstance(year, int) else {int(y) for y in year})
+    unknown = [y for y in years if y not in chps_years()]
+    if unknown:
+        raise ValueError(
+            f"No CHPS data for {unknown}, the available years are {chps_years()}."
+        )
+    return years
+
+
+def chps_table(name: str) -> dict:
+    """The registry entry of a CHPS table (e.g. "t1_la_simd")."""
+    return chps_tables_config["tables"][name]
+
+
+def raw_key(name: str, year: Optional[int] = None) -> str:
+    """S3 key of the raw CSV of a CHPS table for a year (defaults to the latest year)."""
+    (year,) = resolve_chps_years(year)
+    return chps_tables_config["raw_prefix"] + chps_table(name)["raw"].format(year=year)
+
+
+def output_key(name: str) -> str:
+    """S3 key of the processed CSV of the latest year of a CHPS table."""
+    return chps_tables_config["processed_prefix"] + chps_table(name)["output"]
+
+
+def output_table(name: str) -> str:
+    """Name of the processed table of a registry entry, e.g. "simd_sex_developmental_breakdown"."""
+    return Path(chps_table(name)["output"]).stem
+
+
+def partition_key(table: str, year: int) -> str:
+    """S3 key of the partition of a processed CHPS table for a year.
+
+    Args:
+        table (str): Name of the processed table, e.g. "simd_sex_developmental_breakdown".
+        year (int): The publication year.
+
+    Returns:
+        str: The key of the Parquet file of the partition.
+    """
+    prefix = chps_tables_config["partitioned_prefix"]
+    return f"{prefix}year={year}/table={table}/{table}.parquet"
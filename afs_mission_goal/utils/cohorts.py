@@ -0,0 +1,197 @@
+"""
+Cohorts of FRS households, evaluated in one vectorised batch.
+
+A cohort is defined by an income threshold, an optional equivalisation of the income
+and an optional number of children in an age band (see `config/cohorts.yaml`). Every
+cohort is a boolean mask over the households of the base dataframe, so many variants
+of a cohort are evaluated together:
+    - the children of each distinct age band are counted once, with a bincount over
+      the households (see `afs_mission_goal/utils/household_aggregation.py`)
+    - each distinct income (raw or equivalised) is compared to all its thresholds at
+      once, by broadcasting
+
+Usage:
+from afs_mission_goal.utils.cohorts import evaluate_cohorts, select_cohort
+
+masks = evaluate_cohorts(base_df, child_data)
+lowincome_0_5 = select_cohort(base_df, masks, "lowincome_0_5")
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from afs_mission_goal import cohorts_config
+from afs_mission_goal.utils.household_aggregation import (
+    count_by_household,
+    household_codes,
+    household_index,
+)
+
+EQUIVALISATIONS = ["none", "modified_oecd"]
+
+
+def _validate(name: str, definition: dict) -> None:
+    """Check that a cohort definition can be evaluated."""
+    equivalisation = definition.get("equivalisation", "none")
+    if equivalisation not in EQUIVALISATIONS:
+        raise ValueError(
+            f'Equivalisation "{equivalisation}" of cohort {name} is not one of {EQUIVALISATIONS}.'
+        )
+    if "max_income" not in definition or "income_column" not in definition:
+        raise ValueError(f"Cohort {name} needs an income_column and a max_income.")
+
+
+def count_children_by_age(
+    households: pd.Index,
+    child_data: pd.DataFrame,
+    bands: Tuple[Tuple[float, float], ...],
+) -> Dict[Tuple[float, float], np.ndarray]:
+    """Count the children of every household in each age band.
+
+    Args:
+        households (pd.Index): The serial numbers of the households, sorted (see `household_index`).
+        child_data (pd.DataFrame): The child dataframe, with `sernum` and `age_of_child_last_birthday` columns.
+        bands (Tuple[Tuple[float, float]]): The age bands, as (min_age, max_age) with both ages included.
+
+    Returns:
+        Dict[Tuple[float, float], np.ndarray]: The number of children of each household in each band.
+    """
+    codes = household_codes(households, child_data.sernum)
+    ages = child_data.age_of_child_last_birthday
+    return {
+        (min_age, max_age): count_by_household(
+            codes, len(households), ages.between(min_age, max_age)
+        )
+        for min_age, max_age in bands
+    }
+
+
+def modified_oecd_scale(
+    num_adults: np.ndarray,
+    num_children_14_plus: np.ndarray,
+    num_children_under_14: np.ndarray,
+) -> np.ndarray:
+    """The modified OECD equivalence scale of households, as used in the HBAI statistics (a couple is 1).
+
+    Args:
+        num_adults (np.ndarray): The number of adults of each household. Households without adults count one.
+        num_children_14_plus (np.ndarray): The number of children aged 14 or over.
+        num_children_under_14 (np.ndarray): The number of children under 14 (`evaluate_cohorts` also counts
+            the children with a missing age here).
+
+    Returns:
+        np.ndarray: The scale of each household.
+    """
+    return (
+        0.67
+        + 0.33 * (np.maximum(num_adults, 1) - 1)
+        + 0.33 * num_children_14_plus
+        + 0.2 * num_children_under_14
+    )
+
+
+def evaluate_cohorts(
+    base_df: pd.DataFrame,
+    child_data: pd.DataFrame,
+    definitions: Optional[Dict[str, dict]] = None,
+) -> pd.DataFrame:
+    """Evaluate cohort definitions over the households in one batch.
+
+    Args:
+        base_df (pd.DataFrame): The base dataframe, one row per household (see `create_child_adult_base_df`).
+        child_data (pd.DataFrame): The child dataframe, with `sernum` and `age_of_child_last_birthday` columns.
+        definitions (Dict[str, dict], optional): The cohort definitions, in the format of `config/cohorts.yaml`.
+            Defaults to the cohorts of `config/cohorts.yaml`.
+
+    Raises:
+        ValueError: If a definition is invalid, if the households of the base dataframe are missing
+            or duplicated, or if a child is not in one of its households.
+
+    Returns:
+        pd.DataFrame: One boolean column per cohort, indexed by the household `sernum`, in the order of `base_df`.
+    """
+    definitions = definitions or cohorts_config["cohorts"]
+    for name, definition in definitions.items():
+        _validate(name, definition)
+    if base_df.sernum.isna().any() or base_df.sernum.duplicated().any():
+        raise ValueError("The base dataframe needs one row per household sernum.")
+    households = household_index(base_df.sernum)
+    # The counts follow the sorted households, the rows of the base dataframe are taken from them
+    rows = household_codes(households, base_df.sernum)
+    child_codes = household_codes(households, child_data.sernum)
+    outside = child_data.sernum[
+        (child_codes < 0) & child_data.sernum.notna().to_numpy()
+    ]
+    if len(outside):
+        raise ValueError(
+            f"Children of households not in the base dataframe: {sorted(outside.unique().tolist())[:10]}"
+        )
+
+    # Count the children of each distinct age band once
+    bands = {
+        (definition["children"]["min_age"], definition["children"]["max_age"])
+        for definition in definitions.values()
+        if definition.get("children")
+    }
+    equivalised = any(
+        d.get("equivalisation") == "modified_oecd" for d in definitions.values()
+    )
+    if equivalised:
+        bands.add((14, np.inf))
+    children = {
+        band: counts[rows]
+        for band, counts in count_children_by_age(
+            households, child_data, tuple(bands)
+        ).items()
+    }
+    if equivalised:
+        # The children with a missing age count as under 14 in the equivalence scale
+        num_children = count_by_household(child_codes, len(households))[rows]
+        num_children_under_14 = num_children - children[(14, np.inf)]
+
+    # Compare each distinct income to all of its thresholds at once
+    income_groups = {}
+    for name, definition in definitions.items():
+        key = (definition["income_column"], definition.get("equivalisation", "none"))
+        income_groups.setdefault(key, []).append(name)
+    masks = {}
+    for (income_column, equivalisation), names in income_groups.items():
+        income = base_df[income_column].to_numpy(dtype="float64")
+        if equivalisation == "modified_oecd":
+            income = income / modified_oecd_scale(
+                base_df.num_adults.to_numpy(),
+                children[(14, np.inf)],
+                num_children_under_14,
+            )
+        thresholds = np.array([definitions[name]["max_income"] for name in names])
+        below = income[:, None] <= thresholds[None, :]
+        for i, name in enumerate(names):
+            masks[name] = below[:, i]
+
+    for name, definition in definitions.items():
+        if definition.get("children"):
+            band = definition["children"]
+            counts = children[(band["min_age"], band["max_age"])]
+            masks[name] = masks[name] & (counts >= band.get("min_count", 1))
+    return pd.DataFrame(
+        {name: masks[name] for name in definitions},
+        index=pd.Index(base_df.sernum, name="sernum"),
+    )
+
+
+def select_cohort(
+    base_df: pd.DataFrame, masks: pd.DataFrame, name: str
+) -> pd.DataFrame:
+    """The households of the base dataframe in a cohort.
+
+    Args:
+        base_df (pd.DataFrame): The base dataframe the masks were evaluated on.
+        masks (pd.DataFrame): The cohort masks (see `evaluate_cohorts`).
+        name (str): The name of the cohort.
+
+    Returns:
+        pd.DataFrame: The rows of the households in the cohort.
+    """
+    return base_df[masks[name].to_numpy()].reset_index(drop=True)
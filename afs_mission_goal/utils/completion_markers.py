@@ -0,0 +1,127 @@
+"""
+Completion markers for resumable pipeline jobs.
+
+When a job finishes, a small JSON marker is written to S3 with a fingerprint of the
+inputs it was run on (the ETags of its input objects). A rerun can then skip every
+job whose marker matches the current fingerprint, so after a failure only the jobs
+that did not finish, or whose inputs changed, are run again.
+
+Markers are stored under `config["completion_markers"]["prefix"]` in the bucket the
+job writes to. A job run by a forced pipeline run (see `run_pipeline.py --force`) gets
+the `FORCE_ENVIRONMENT_VARIABLE` set, and should then ignore its markers.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from botocore.exceptions import ClientError
+
+from afs_mission_goal import config
+from afs_mission_goal.utils.s3_cache import is_missing_object, s3
+
+logger = logging.getLogger(__name__)
+
+FORCE_ENVIRONMENT_VARIABLE = "AFS_PIPELINE_FORCE"
+
+
+def _marker_key(name: str) -> str:
+    """S3 key of the marker of a job."""
+    prefix = config.get("completion_markers", {}).get("prefix", "pipeline_markers")
+    return f"{prefix}/{name}.json"
+
+
+def object_fingerprint(bucket: str, keys: Iterable[str]) -> str:
+    """Fingerprint a set of S3 objects by their keys and ETags, without downloading them.
+
+    Keys ending in "/" or "*" are treated as prefixes and fingerprint every object under them.
+
+    Args:
+        bucket (str): The S3 bucket.
+        keys (Iterable[str]): The S3 keys (or prefixes) of the objects.
+
+    Returns:
+        str: A hash that changes whenever any of the objects changes, appears or disappears.
+    """
+    etags = {}
+    for key in sorted(set(keys)):
+        if key.endswith("/") or key.endswith("*"):
+            paginator = s3.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket, Prefix=key.rstrip("*")):
+                for obj in page.get("Contents", []):
+                    etags[obj["Key"]] = obj["ETag"].strip('"')
+            continue
+        try:
+            etags[key] = s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+        except ClientError as e:
+            if not is_missing_object(e):
+                raise
+            etags[key] = None
+    digest = hashlib.sha256(json.dumps(etags, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_marker(bucket: str, name: str) -> Optional[dict]:
+    """Get the completion marker of a job.
+
+    Args:
+        bucket (str): The S3 bucket holding the marker.
+        name (str): Name of the job.
+
+    Returns:
+        Optional[dict]: The marker, or None if the job has not completed.
+    """
+    try:
+        response = s3.get_object(Bucket=bucket, Key=_marker_key(name))
+    except ClientError as e:
+        if is_missing_object(e):
+            return None
+        raise
+    return json.loads(response["Body"].read())
+
+
+def is_forced() -> bool:
+    """Whether the job is run by a forced pipeline run, so its markers should be ignored."""
+    return os.environ.get(FORCE_ENVIRONMENT_VARIABLE) == "1"
+
+
+def is_complete(bucket: str, name: str, fingerprint: str) -> bool:
+    """Whether a job has completed on inputs with the given fingerprint.
+
+    Args:
+        bucket (str): The S3 bucket holding the marker.
+        name (str): Name of the job.
+        fingerprint (str): Fingerprint of the current inputs of the job.
+
+    Returns:
+        bool: True if the job can be skipped.
+    """
+    marker = get_marker(bucket, name)
+    return marker is not None and marker.get("fingerprint") == fingerprint
+
+
+def write_marker(bucket: str, name: str, fingerprint: str, **info) -> None:
+    """Record that a job has completed on inputs with the given fingerprint.
+
+    Args:
+        bucket (str): The S3 bucket holding the marker.
+        name (str): Name of the job.
+        fingerprint (str): Fingerprint of the inputs the job ran on.
+        info: Any other JSON-serialisable information to store with the marker (e.g. row counts).
+    """
+    marker = {
+        "name": name,
+        "fingerprint": fingerprint,
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        **info,
+    }
+    s3.put_object(
+        Bucket=bucket,
+        Key=_marker_key(name),
+        Body=json.dumps(marker).encode("utf-8"),
+        ContentType="application/json",
+    )
+    logger.info(f"Marked {name} as complete")
@@ -0,0 +1,106 @@
+"""
+Aggregation of the FRS people to their households in one pass per table.
+
+The households are the sorted union of the household serial numbers (`sernum`) of
+every table. Each table's `sernum` column is coded once, as the positions of its
+values in the households (`np.searchsorted`), and every count of the table is then
+a `np.bincount` of those codes, so no table is grouped or merged on `sernum`. The
+counts are arrays aligned to the households, and household-level columns are
+aligned to them by reindexing.
+
+Usage:
+households = household_index(child.sernum, adult.sernum, household.sernum)
+child_codes = household_codes(households, child.sernum)
+num_children = count_by_household(child_codes, len(households), child.age.notna())
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def household_index(*sernums: pd.Series) -> pd.Index:
+    """The households of one or more tables: the sorted union of their serial numbers.
+
+    Args:
+        sernums (pd.Series): The `sernum` column of each table.
+
+    Returns:
+        pd.Index: The distinct serial numbers, sorted, named "sernum".
+    """
+    values = np.unique(
+        np.concatenate([pd.Series(sernum).dropna().to_numpy() for sernum in sernums])
+    )
+    return pd.Index(values, name="sernum")
+
+
+def household_codes(households: pd.Index, sernum: pd.Series) -> np.ndarray:
+    """Code the serial numbers of a table as positions in the households.
+
+    Args:
+        households (pd.Index): The households, sorted (see `household_index`).
+        sernum (pd.Series): The `sernum` column of the table.
+
+    Raises:
+        ValueError: If the households are not sorted.
+
+    Returns:
+        np.ndarray: The position of the household of every row, -1 where `sernum` is missing
+            or is not one of the households.
+    """
+    if not households.is_monotonic_increasing:
+        raise ValueError("The households must be sorted, see `household_index`.")
+    values = pd.Series(sernum).to_numpy()
+    missing = pd.isna(values)
+    if len(households) == 0:
+        return np.full(len(values), -1)
+    sorted_households = households.to_numpy()
+    codes = np.searchsorted(sorted_households, np.where(missing, households[0], values))
+    # Serial numbers that are not households land next to one, or past the last one
+    codes = np.minimum(codes, len(households) - 1)
+    found = ~missing & (sorted_households[codes] == values)
+    return np.where(found, codes, -1)
+
+
+def count_by_household(
+    codes: np.ndarray, n_households: int, where: Optional[pd.Series] = None
+) -> np.ndarray:
+    """Count the rows of a table in every household, optionally only those matching a condition.
+
+    Args:
+        codes (np.ndarray): The household of every row (see `household_codes`).
+        n_households (int): The number of households.
+        where (pd.Series, optional): Only count the rows where it is True (missing counts as False).
+
+    Returns:
+        np.ndarray: The number of rows of every household.
+    """
+    keep = codes >= 0
+    if where is not None:
+        keep &= pd.Series(where).fillna(False).to_numpy(dtype=bool)
+    return np.bincount(codes[keep], minlength=n_households)
+
+
+def align_to_households(
+    households: pd.Index, df: pd.DataFrame, fill_value=0
+) -> pd.DataFrame:
+    """Align household-level columns to the households.
+
+    Args:
+        households (pd.Index): The households (see `household_index`).
+        df (pd.DataFrame): One row per household, with a `sernum` column.
+        fill_value: The value of the households without a row, or with a missing value. Defaults to 0.
+
+    Raises:
+        ValueError: If a household has several rows.
+
+    Returns:
+        pd.DataFrame: The other columns of `df`, indexed by the households.
+    """
+    duplicated = df.sernum[df.sernum.duplicated()]
+    if len(duplicated):
+        raise ValueError(
+            f"Households with several rows: {sorted(duplicated.unique())[:10]}"
+        )
+    return df.set_index("sernum").reindex(households).fillna(fill_value)
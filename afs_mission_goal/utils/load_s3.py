@@ -1,19 +1,17 @@
 import pandas as pd
 import logging
-import boto3
 from botocore.exceptions import ClientError
-import tempfile
 from fnmatch import fnmatch
 import requests
 import json
-from typing import Any
+from typing import Any, Iterator, List, Optional
 
 from afs_mission_goal import DS_BUCKET
+from afs_mission_goal.utils.s3_cache import fetch_object, get_cache_settings, s3
+from afs_mission_goal.utils.parquet_storage import select_columns, filter_columns
 
 logger = logging.getLogger(__name__)
 
-s3 = boto3.client("s3")
-
 
 def s3_exists(path: str, **kwargs) -> bool:
     """Checks whether 'data/{path}' exists in 'BUCKET' in S3
@@ -55,14 +53,127 @@ def data_from_s3(path: str, filename: str, **kwargs) -> Any:
         logging.warning(f"s3://{bucket}/data/{path} does not exist.")
 
 
+def resolve_stata_columns(
+    path: str, columns: Optional[List[str]]
+) -> Optional[List[str]]:
+    """Match requested column names to the variable names of a Stata file, ignoring case.
+
+    Args:
+        path (str): Path to the local Stata file.
+        columns (List[str], optional): The requested column names.
+
+    Raises:
+        KeyError: If any of the requested columns is not in the file.
+
+    Returns:
+        Optional[List[str]]: The variable names as written in the file, or None if no columns were requested.
+    """
+    if columns is None:
+        return None
+    with pd.read_stata(path, iterator=True) as reader:
+        variables = list(reader.variable_labels())
+    lookup = {variable.upper(): variable for variable in variables}
+    missing = [column for column in columns if column.upper() not in lookup]
+    if missing:
+        raise KeyError(f"Columns {missing} not found in {path}")
+    return list(dict.fromkeys(lookup[column.upper()] for column in columns))
+
+
+def downcast_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast the float64 columns of a dataframe to float32.
+
+    Integer columns are left as they are: Stata already stores them at the smallest
+    width that fits (byte, int or long), and keeping them unchanged means every chunk
+    of a file gets the same dtypes.
+
+    Args:
+        df (pd.DataFrame): The dataframe to downcast.
+
+    Returns:
+        pd.DataFrame: The dataframe with float32 columns in place of float64 ones.
+    """
+    float_columns = df.columns[df.dtypes == "float64"]
+    if len(float_columns) > 0:
+        df = df.astype({column: "float32" for column in float_columns})
+    return df
+
+
+def read_stata(
+    path: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[list] = None,
+    downcast: bool = False,
+    chunksize: Optional[int] = None,
+) -> Any:
+    """Read a local Stata file, either whole or as an iterator of chunks.
+
+    Args:
+        path (str): Path to the local Stata file.
+        columns (List[str], optional): Only read these columns (matched ignoring case).
+        filters (list, optional): Only keep the rows matching these filters, in the format
+            described in `afs_mission_goal.utils.parquet_storage`.
+        downcast (bool): Whether to downcast float64 columns to float32. Defaults to False.
+        chunksize (int, optional): If given, return an iterator of dataframes with at most this many rows.
+
+    Returns:
+        Any: A dataframe, or an iterator of dataframes if `chunksize` is given.
+    """
+    resolved_columns = resolve_stata_columns(path, columns)
+    read_columns = resolved_columns
+    if resolved_columns is not None and filters:
+        read_columns = resolve_stata_columns(
+            path, resolved_columns + filter_columns(filters)
+        )
+
+    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+        df = select_columns(df, resolved_columns, filters)
+        return downcast_floats(df) if downcast else df
+
+    if chunksize is None:
+        return _prepare(
+            pd.read_stata(path, convert_categoricals=False, columns=read_columns)
+        )
+
+    def _chunks() -> Iterator[pd.DataFrame]:
+        with pd.read_stata(
+            path, convert_categoricals=False, columns=read_columns, chunksize=chunksize
+        ) as reader:
+            for chunk in reader:
+                yield _prepare(chunk)
+
+    return _chunks()
+
+
+def _iter_stata_from_s3(bucket: str, key: str, **kwargs) -> Iterator[pd.DataFrame]:
+    """Yield chunks of a Stata file in S3, removing the local copy at the end when the cache is off."""
+    local_path = fetch_object(bucket, key)
+    try:
+        yield from read_stata(local_path, **kwargs)
+    finally:
+        if get_cache_settings()["mode"] == "off":
+            local_path.unlink(missing_ok=True)
+
+
 def load_from_s3(path: str, **kwargs) -> Any:
     """Loads 'data/{path}' from 'BUCKET' in S3. If you wish to load a json or csv, please use the nesta_ds_utils package (pip install nesta_ds_utils[s3] @ git+https://github.com/nestauk/nesta_ds_utils.git) and use loading_saving.download_obj.
 
+    The object is read from the local S3 cache (see `afs_mission_goal.utils.s3_cache`), so repeated loads of the same file are served from disk.
+
     Args:
         path (str): Path to file after 'data/' in 'BUCKET' in S3
             E.g. `path="aux/Ward_Boundaries.geojson"` will
             fetch the s3 key
             `"s3://{BUCKET}/data/aux/Ward_Boundaries.geojson"`
+        kwargs:
+            bucket (str): The S3 bucket. Defaults to DS_BUCKET.
+            columns (List[str]): For ".dta" files, only read these columns (matched ignoring case).
+            filters (list): For ".dta" files, only keep the rows matching these filters,
+                in the format described in `afs_mission_goal.utils.parquet_storage`.
+                The filtered columns must be named as written in the file.
+            downcast (bool): For ".dta" files, downcast float64 columns to float32.
+            chunksize (int): For ".dta" files, return an iterator of dataframes with at most
+                this many rows instead of a single dataframe, so large files can be processed
+                with bounded memory.
 
     Returns:
         Any: Data from 'data/{path}' in S3 'BUCKET'.
@@ -70,37 +181,44 @@ def load_from_s3(path: str, **kwargs) -> Any:
     bucket = kwargs.get("bucket", DS_BUCKET)
     header = kwargs.get("header", 0)
     index_col = kwargs.get("index_col", None)
-    if fnmatch(path, "*.xlsm") or fnmatch(path, "*.xlsx"):
-        temp = tempfile.NamedTemporaryFile()
-        data_from_s3(path, temp.name, bucket)
-        sheet_name = kwargs.get("sheet_name", "Sheet1")
-        usecols = kwargs.get("usecols", None)
-        skiprows = kwargs.get("skiprows", None)
-        df = pd.read_excel(
-            temp.name,
-            sheet_name=sheet_name,
-            header=header,
-            usecols=usecols,
-            skiprows=skiprows,
-            index_col=index_col,
-        )
-        temp.close()
-        return df
-    elif fnmatch(path, "*.dta"):
-        temp = tempfile.NamedTemporaryFile()
-        data_from_s3(path, temp.name, bucket=bucket)
-        df = pd.read_stata(temp.name, convert_categoricals=False)
-        temp.close()
-        return df
-    elif fnmatch(path, "*.geojson"):
-        object_path = "data/" + path
-        geojson = s3.get_object(Bucket=bucket, Key=object_path)
-        geojson = geojson["Body"].read().decode("utf-8")
-        return json.loads(geojson)
-    else:
+    if not any(
+        fnmatch(path, pattern) for pattern in ["*.xlsm", "*.xlsx", "*.dta", "*.geojson"]
+    ):
         logger.exception(
             'Function not supported for file type other than ".xlsx", ".geojson", ".dta" and ".xlsm"'
         )
         raise ValueError(
             'Function not supported for file type other than ".xlsx", ".geojson", ".dta" and ".xlsm"'
         )
+    stata_kwargs = {
+        "columns": kwargs.get("columns", None),
+        "filters": kwargs.get("filters", None),
+        "downcast": kwargs.get("downcast", False),
+    }
+    if fnmatch(path, "*.dta") and kwargs.get("chunksize", None):
+        return _iter_stata_from_s3(
+            bucket, "data/" + path, chunksize=kwargs["chunksize"], **stata_kwargs
+        )
+    local_path = fetch_object(bucket, "data/" + path)
+    try:
+        if fnmatch(path, "*.xlsm") or fnmatch(path, "*.xlsx"):
+            sheet_name = kwargs.get("sheet_name", "Sheet1")
+            usecols = kwargs.get("usecols", None)
+            skiprows = kwargs.get("skiprows", None)
+            return pd.read_excel(
+                local_path,
+                sheet_name=sheet_name,
+                header=header,
+                usecols=usecols,
+                skiprows=skiprows,
+                index_col=index_col,
+            )
+        elif fnmatch(path, "*.dta"):
+            return read_stata(local_path, **stata_kwargs)
+        else:
+            with open(local_path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+    finally:
+        # Without the cache the local copy is a temporary file
+        if get_cache_settings()["mode"] == "off":
+            local_path.unlink(missing_ok=True)
@@ -0,0 +1,423 @@
+"""
+Functions for saving and loading the processed tables as Parquet.
+
+Processed tables are written as Parquet with explicit column types and with
+low-cardinality text columns stored as dictionary-encoded categoricals, so they
+load with the right dtypes and only the requested columns are read.
+
+The paths used throughout the pipeline still end in ".csv"; the Parquet copy is
+stored next to it under the same key with a ".parquet" suffix. While the
+processed data is being migrated, the loaders fall back to the CSV when there is
+no Parquet copy, and a CSV copy is still written when
+`config["parquet_storage"]["write_csv_copy"]` is true.
+
+Filters use the pyarrow format: a list of `(column, operator, value)` tuples that
+must all hold, or a list of such lists, any of which must hold. The supported
+operators are "==", "=", "!=", "<", "<=", ">", ">=", "in" and "not in". E.g.
+`filters=[("sernum", "in", [1, 2, 3]), ("age", ">=", 16)]`.
+"""
+
+import io
+import logging
+import operator
+import struct
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from botocore.exceptions import ClientError
+from nesta_ds_utils.loading_saving import S3
+
+from afs_mission_goal import config
+from afs_mission_goal.utils.s3_cache import (
+    cached_download_obj,
+    is_missing_object,
+    s3,
+)
+
+logger = logging.getLogger(__name__)
+
+_storage_config = config.get("parquet_storage", {})
+
+Filters = Union[List[Tuple], List[List[Tuple]]]
+
+# Bytes read from the end of a Parquet file to get its footer in one request
+_FOOTER_READ_SIZE = 64 * 1024
+
+_OPERATORS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def to_parquet_path(path: str) -> str:
+    """Convert the ".csv" S3 key of a processed table into the key of its Parquet copy.
+
+    Args:
+        path (str): S3 key of the table, e.g. "data/processed/family_resources_survey_adult.csv".
+
+    Returns:
+        str: The same key with a ".parquet" suffix.
+    """
+    if path.endswith(".csv"):
+        path = path[: -len(".csv")]
+    return path if path.endswith(".parquet") else f"{path}.parquet"
+
+
+def to_csv_path(path: str) -> str:
+    """Convert the ".parquet" S3 key of a processed table into the key of its CSV copy."""
+    if path.endswith(".parquet"):
+        path = path[: -len(".parquet")]
+    return path if path.endswith(".csv") else f"{path}.csv"
+
+
+def set_explicit_dtypes(
+    df: pd.DataFrame, categorical_threshold: Optional[float] = None
+) -> pd.DataFrame:
+    """Give every object column of a dataframe an explicit type that can be stored in Parquet.
+
+    - Text columns with few distinct values (relative to the number of rows) become categoricals.
+    - Columns mixing numbers with empty strings become numeric, with the empty strings as NaN.
+    - Any other mixed column is stored as text.
+
+    Args:
+        df (pd.DataFrame): The dataframe to type.
+        categorical_threshold (float, optional): Maximum ratio of distinct values to rows
+            for a text column to be stored as a categorical. Defaults to the config value.
+
+    Returns:
+        pd.DataFrame: A copy of the dataframe with explicit dtypes.
+    """
+    if categorical_threshold is None:
+        categorical_threshold = _storage_config.get("categorical_threshold", 0.5)
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        inferred = pd.api.types.infer_dtype(df[col], skipna=True)
+        if inferred == "empty":
+            df[col] = df[col].astype("float")
+            continue
+        if inferred != "string":
+            values = df[col].mask(df[col].eq(""))
+            numeric = pd.to_numeric(values, errors="coerce")
+            if numeric.notna().sum() == values.notna().sum():
+                df[col] = numeric
+                continue
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        if df[col].nunique() <= categorical_threshold * max(len(df), 1):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def upload_parquet(df: pd.DataFrame, bucket: str, path_to: str) -> None:
+    """Upload a dataframe to S3 as a Parquet file with explicit dtypes.
+
+    A GeoDataFrame is written by geopandas as GeoParquet, so its geometry and CRS are kept.
+
+    Args:
+        df (pd.DataFrame): The dataframe (or GeoDataFrame) to upload.
+        bucket (str): The S3 bucket.
+        path_to (str): S3 key to save the file to (the suffix is replaced by ".parquet").
+    """
+    compression = _storage_config.get("compression", "zstd")
+    buffer = io.BytesIO()
+    if hasattr(df, "to_wkb"):
+        # Only GeoDataFrames have geometries to encode
+        df.to_parquet(buffer, index=False, compression=compression)
+    else:
+        table = pa.Table.from_pandas(set_explicit_dtypes(df), preserve_index=False)
+        pq.write_table(table, buffer, compression=compression, use_dictionary=True)
+    s3.put_object(Bucket=bucket, Key=to_parquet_path(path_to), Body=buffer.getvalue())
+
+
+def save_processed_table(
+    df: pd.DataFrame,
+    bucket: str,
+    path_to: str,
+    csv_copy: Optional[pd.DataFrame] = None,
+) -> None:
+    """Save a processed table to S3 as Parquet, plus a CSV copy while the CSV paths are still in use.
+
+    Args:
+        df (pd.DataFrame): The dataframe to save.
+        bucket (str): The S3 bucket.
+        path_to (str): S3 key of the table, either with a ".csv" or ".parquet" suffix.
+        csv_copy (pd.DataFrame, optional): The dataframe to save as the CSV copy, where the CSV readers
+            expect an earlier layout of the table. Defaults to `df`.
+    """
+    upload_parquet(df, bucket, path_to)
+    if _storage_config.get("write_csv_copy", True):
+        S3.upload_obj(
+            obj=df if csv_copy is None else csv_copy,
+            bucket=bucket,
+            path_to=to_csv_path(path_to),
+            kwargs_writing={"index": False},
+        )
+
+
+def _chunk_dtypes(chunk: pd.DataFrame) -> dict:
+    """The column types of a chunked table, from its first chunk typed with `set_explicit_dtypes`.
+
+    Integer columns become nullable integers, as the other chunks may have missing values in them.
+    """
+    return {
+        col: pd.Int64Dtype() if pd.api.types.is_integer_dtype(dtype) else dtype
+        for col, dtype in set_explicit_dtypes(chunk).dtypes.items()
+    }
+
+
+def _conform_chunk(chunk: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Give a chunk of a table the column types of the table (see `_chunk_dtypes`).
+
+    Raises:
+        ValueError: If a column of the chunk cannot have the type of the table, e.g. text in a numeric column.
+    """
+    chunk = set_explicit_dtypes(chunk)
+    for col, dtype in dtypes.items():
+        values = chunk[col]
+        if isinstance(dtype, pd.CategoricalDtype):
+            # The categories of every chunk are stored in its own row group
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                continue
+            values = values.astype(object)
+            chunk[col] = values.where(values.isna(), values.astype(str)).astype(
+                "category"
+            )
+        elif pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype):
+            values = values.astype(object)
+            try:
+                chunk[col] = pd.to_numeric(values.mask(values.eq(""))).astype(dtype)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Column {col} of a chunk is not {dtype}: {e}")
+        elif dtype == object:
+            values = values.astype(object)
+            chunk[col] = values.where(values.isna(), values.astype(str))
+    return chunk
+
+
+def _chunk_schema(chunk: pd.DataFrame) -> pa.Schema:
+    """The Parquet schema of a chunked table, from its first conformed chunk.
+
+    The categoricals use 32-bit codes, so the other chunks may have more categories.
+    """
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    fields = [
+        (
+            pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+            if pa.types.is_dictionary(field.type)
+            else field
+        )
+        for field in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def save_processed_table_chunks(
+    chunks: Iterable[pd.DataFrame], bucket: str, path_to: str
+) -> int:
+    """Save a processed table given as an iterable of dataframes, one chunk at a time.
+
+    Each chunk is appended to a local Parquet file as a row group (and to a CSV copy while
+    `write_csv_copy` is set), which are then uploaded, so only one chunk is held in memory.
+    The column types are those `set_explicit_dtypes` gives the first non-empty chunk, and
+    every chunk is converted to them. Integer columns are stored as nullable integers, so
+    chunks with missing values in them stay integers.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Chunks of the table, all with the same columns.
+        bucket (str): The S3 bucket.
+        path_to (str): S3 key of the table, either with a ".csv" or ".parquet" suffix.
+
+    Returns:
+        int: The number of rows saved.
+    """
+    write_csv_copy = _storage_config.get("write_csv_copy", True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parquet_file = Path(tmp_dir) / "table.parquet"
+        csv_file = Path(tmp_dir) / "table.csv"
+        writer, schema, dtypes, empty_chunk, n_rows = None, None, None, None, 0
+        try:
+            for chunk in chunks:
+                if len(chunk) == 0:
+                    empty_chunk = chunk if empty_chunk is None else empty_chunk
+                    continue
+                if dtypes is None:
+                    dtypes = _chunk_dtypes(chunk)
+                chunk = _conform_chunk(chunk, dtypes)
+                if writer is None:
+                    schema = _chunk_schema(chunk)
+                    writer = pq.ParquetWriter(
+                        parquet_file,
+                        schema,
+                        compression=_storage_config.get("compression", "zstd"),
+                        use_dictionary=True,
+                    )
+                writer.write_table(
+                    pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                )
+                if write_csv_copy:
+                    chunk.to_csv(csv_file, mode="a", header=n_rows == 0, index=False)
+                n_rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            if empty_chunk is None:
+                raise ValueError(f"No data to save to {path_to}")
+            save_processed_table(empty_chunk, bucket, path_to)
+            return 0
+        s3.upload_file(str(parquet_file), bucket, to_parquet_path(path_to))
+        if write_csv_copy:
+            s3.upload_file(str(csv_file), bucket, to_csv_path(path_to))
+    return n_rows
+
+
+def _normalise_filters(filters: Filters) -> List[List[Tuple]]:
+    """Convert filters to a list of lists of (column, operator, value) tuples."""
+    if filters and isinstance(filters[0], tuple):
+        return [list(filters)]
+    return [list(conjunction) for conjunction in filters]
+
+
+def filter_columns(filters: Optional[Filters]) -> List[str]:
+    """The columns referenced by a set of filters."""
+    if not filters:
+        return []
+    return list(
+        dict.fromkeys(
+            column
+            for conjunction in _normalise_filters(filters)
+            for column, _, _ in conjunction
+        )
+    )
+
+
+def apply_filters(df: pd.DataFrame, filters: Optional[Filters]) -> pd.DataFrame:
+    """Keep the rows of a dataframe that match a set of filters.
+
+    Used where the filters cannot be pushed down to the file format (CSV and Stata files).
+
+    Args:
+        df (pd.DataFrame): The dataframe to filter.
+        filters (Filters, optional): Filters in the pyarrow format (see the module docstring).
+
+    Returns:
+        pd.DataFrame: The rows of the dataframe matching the filters.
+    """
+    if not filters:
+        return df
+    keep = pd.Series(False, index=df.index)
+    for conjunction in _normalise_filters(filters):
+        matches = pd.Series(True, index=df.index)
+        for column, op, value in conjunction:
+            if op == "in":
+                matches &= df[column].isin(value)
+            elif op == "not in":
+                matches &= ~df[column].isin(value)
+            elif op in _OPERATORS:
+                matches &= _OPERATORS[op](df[column], value)
+            else:
+                raise ValueError(f'Filter operator "{op}" is not supported.')
+        keep |= matches
+    return df[keep]
+
+
+def select_columns(
+    df: pd.DataFrame, columns: Optional[Sequence[str]], filters: Optional[Filters]
+) -> pd.DataFrame:
+    """Filter a dataframe and then keep only the requested columns.
+
+    Args:
+        df (pd.DataFrame): A dataframe holding the requested columns and the filtered columns.
+        columns (Sequence[str], optional): The columns to keep. If None, all columns are kept.
+        filters (Filters, optional): Filters in the pyarrow format (see the module docstring).
+
+    Returns:
+        pd.DataFrame: The filtered dataframe with the requested columns.
+    """
+    df = apply_filters(df, filters)
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True) if filters else df
+
+
+def read_processed_table(
+    bucket: str,
+    path: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    """Load a processed table from S3, preferring its Parquet copy over the CSV.
+
+    With the Parquet copy, only the requested columns are read and the filters are
+    pushed down to skip row groups that cannot match. With the CSV, only the requested
+    (and filtered) columns are parsed and the rows are filtered once loaded.
+
+    Args:
+        bucket (str): The S3 bucket.
+        path (str): S3 key of the table, either with a ".csv" or ".parquet" suffix.
+        columns (List[str], optional): Only load these columns.
+        filters (Filters, optional): Only load the rows matching these filters (see the module docstring).
+
+    Returns:
+        pd.DataFrame: The processed table.
+    """
+    try:
+        return cached_download_obj(
+            bucket,
+            to_parquet_path(path),
+            download_as="dataframe",
+            kwargs_reading={"columns": columns, "filters": filters or None},
+        )
+    except (ClientError, FileNotFoundError) as e:
+        if not is_missing_object(e):
+            raise
+        logger.info(f"No Parquet copy of {path}, reading the CSV")
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(list(columns) + filter_columns(filters)))
+    df = cached_download_obj(
+        bucket,
+        to_csv_path(path),
+        download_as="dataframe",
+        kwargs_reading={"usecols": usecols},
+    )
+    return select_columns(df, columns, filters)
+
+
+def _read_tail(bucket: str, key: str, size: int) -> bytes:
+    """Read the last `size` bytes of an S3 object (or the whole object if it is smaller)."""
+    response = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{size}")
+    return response["Body"].read()
+
+
+def read_parquet_metadata(bucket: str, path: str) -> pq.FileMetaData:
+    """Read the metadata of the Parquet copy of a processed table from its footer only.
+
+    Only the end of the file is requested from S3, so the number of rows and the schema
+    are known without downloading the data.
+
+    Args:
+        bucket (str): The S3 bucket.
+        path (str): S3 key of the table, either with a ".csv" or ".parquet" suffix.
+
+    Raises:
+        ClientError: If the table has no Parquet copy.
+
+    Returns:
+        pq.FileMetaData: The metadata, e.g. `num_rows` and `schema.names`.
+    """
+    key = to_parquet_path(path)
+    tail = _read_tail(bucket, key, _FOOTER_READ_SIZE)
+    # The file ends with the footer, its length (4 bytes) and the magic bytes "PAR1"
+    footer_size = struct.unpack("<I", tail[-8:-4])[0] + 8
+    if footer_size > len(tail):
+        tail = _read_tail(bucket, key, footer_size)
+    return pq.read_metadata(pa.BufferReader(tail[-footer_size:]))
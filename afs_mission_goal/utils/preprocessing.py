@@ -1,3 +1,6 @@
+import re
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
 import geopandas as gpd
@@ -30,27 +33,57 @@ def remove_nan_rows_and_columns(df) -> pd.DataFrame:
     return df
 
 
+# Characters replaced by a space, and characters removed, before the spaces are collapsed
+_STRING_TRANSLATION = str.maketrans(
+    {"/": " ", ":": None, "(": None, ")": None, "%": None, "'": None}
+)
+_NON_WORD_CHARACTER = re.compile(r"[^a-zA-Z0-9_]")
+
+
+@lru_cache(maxsize=100_000)
+def preprocess_string(string: str) -> str:
+    """Clean a string like `preprocess_strings`, memoised as the same headers and labels recur across tables.
+
+    Args:
+        string (str): The string to clean.
+
+    Returns:
+        str: The cleaned string.
+    """
+    string = string.translate(_STRING_TRANSLATION).replace("  ", " ").strip().lower()
+    return _NON_WORD_CHARACTER.sub("_", string).replace("___", "_").replace("__", "_")
+
+
 def preprocess_strings(strings: pd.Series) -> pd.Series:
     """Cleaning list of strings; removing punctuation and extra spaces,
     making the text lower case and placing _ for the remaining whitespace.
 
+    Only the distinct strings are cleaned, in a single pass each (see `preprocess_string`).
+
     Args:
         strings (pd.Series): Panda series of strings to clean.
 
     Returns:
         pd.Series: Pandas series of cleaned strings.
     """
-    strings = (
-        strings.str.replace(r"[/]", " ", regex=True)
-        .str.replace(r"[:()\%']", "", regex=True)
-        .str.replace("  ", " ", regex=True)
-        .str.strip()
-        .str.lower()
-        .str.replace(r"[^a-zA-Z0-9_]", r"_", regex=True)
-        .str.replace("___", "_", regex=True)
-        .str.replace("__", "_", regex=True)
+    codes, uniques = pd.factorize(strings, use_na_sentinel=True)
+    cleaned = np.array(
+        [
+            preprocess_string(value) if isinstance(value, str) else np.nan
+            for value in uniques
+        ]
+        + [np.nan],
+        dtype=object,
+    )[codes]
+    # Missing values (code -1) stay as they are
+    missing = codes == -1
+    cleaned[missing] = np.asarray(strings, dtype=object)[missing]
+    return pd.Series(
+        cleaned,
+        index=strings.index,
+        name=strings.name,
+        dtype=strings.dtype if isinstance(strings.dtype, pd.StringDtype) else object,
     )
-    return strings
 
 
 def preprocess_strings_reverse(strings: pd.Series) -> pd.Series:
@@ -70,7 +103,10 @@ def preprocess_strings_reverse(strings: pd.Series) -> pd.Series:
 
 def column_txt_suppression(data, cols, suppressor="< 5") -> pd.DataFrame:
     """Supresses the numeric value in the columns specified in cols if less
-    than 5.
+    than 5, in a new `<column>_txt` column.
+
+    This renders the suppression as text, so it is meant for exporting a table. To keep the counts
+    numeric, see the suppression masks in `afs_mission_goal/utils/suppression.py`.
 
     Args:
         data (pd.DataFrame): Dataframe containing the columns to be suppressed
@@ -82,7 +118,9 @@ def column_txt_suppression(data, cols, suppressor="< 5") -> pd.DataFrame:
     """
 
     for col in cols:
-        data[col + "_txt"] = data[col].apply(lambda x: suppressor if x < 5 else x)
+        data[col + "_txt"] = (
+            data[col].astype(object).mask(data[col].lt(5).fillna(False), suppressor)
+        )
 
     return data
 
@@ -0,0 +1,301 @@
+"""
+Local on-disk cache for objects stored in S3.
+
+Every object is stored under the cache directory keyed by its bucket/key and the
+ETag S3 reports for it, so a changed object never reuses a stale copy. The
+cache is size-bounded and evicts the least recently used objects first.
+
+The behaviour is controlled by the `s3_cache` section of `config/base.yaml` and
+can be overridden with the `AFS_S3_CACHE_MODE`, `AFS_S3_CACHE_DIR` and
+`AFS_S3_CACHE_MAX_SIZE_GB` environment variables. The available modes are:
+    - "revalidate": send a conditional GET (If-None-Match) on every load and
+      serve the local copy when S3 answers "304 Not Modified".
+    - "prefer_cache": serve the local copy without contacting S3, only
+      downloading objects that are not cached yet.
+    - "offline": never contact S3, raising an error for objects that are not cached.
+    - "off": bypass the cache and download the object every time.
+
+Usage:
+from afs_mission_goal.utils.s3_cache import cached_download_obj
+
+df = cached_download_obj(S3_BUCKET, "path/to/file.csv", download_as="dataframe")
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+import boto3
+import pandas as pd
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from afs_mission_goal import PROJECT_DIR, config
+
+logger = logging.getLogger(__name__)
+
+# A single client shared by every loader; boto3 clients are thread safe, so the
+# connection pool is sized for the concurrent bulk loads.
+s3 = boto3.client(
+    "s3",
+    config=Config(
+        max_pool_connections=max(
+            10, config.get("bulk_loading", {}).get("max_workers", 8)
+        ),
+        retries={"max_attempts": 5, "mode": "standard"},
+    ),
+)
+
+CACHE_MODES = ["revalidate", "prefer_cache", "offline", "off"]
+
+
+def get_cache_settings() -> dict:
+    """Get the cache directory, maximum size and mode from the config and environment.
+
+    Returns:
+        dict: Dictionary with the keys "directory" (Path), "max_size_bytes" (int) and "mode" (str).
+    """
+    cache_config = config.get("s3_cache", {})
+    directory = Path(
+        os.environ.get(
+            "AFS_S3_CACHE_DIR", cache_config.get("directory", "inputs/s3_cache")
+        )
+    )
+    if not directory.is_absolute():
+        directory = PROJECT_DIR / directory
+    max_size_gb = float(
+        os.environ.get("AFS_S3_CACHE_MAX_SIZE_GB", cache_config.get("max_size_gb", 20))
+    )
+    mode = os.environ.get("AFS_S3_CACHE_MODE", cache_config.get("mode", "revalidate"))
+    if mode not in CACHE_MODES:
+        raise ValueError(f"S3 cache mode must be one of {CACHE_MODES}, not '{mode}'.")
+    return {
+        "directory": directory,
+        "max_size_bytes": int(max_size_gb * 1024**3),
+        "mode": mode,
+    }
+
+
+def _entry_dir(cache_dir: Path, bucket: str, key: str) -> Path:
+    """Directory holding the cached copy and metadata of s3://{bucket}/{key}."""
+    digest = hashlib.sha256(f"{bucket}/{key}".encode("utf-8")).hexdigest()
+    return cache_dir / digest[:2] / digest
+
+
+def _suffix(key: str) -> str:
+    """File suffix of the S3 key (e.g. ".csv"), kept so readers can dispatch on it."""
+    return "".join(Path(key).suffixes)
+
+
+def _read_entry(entry_dir: Path) -> Optional[dict]:
+    """Read the metadata of a cache entry, returning None if it is missing or incomplete."""
+    try:
+        with open(entry_dir / "meta.json", "rt") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if not (entry_dir / meta["filename"]).exists():
+        return None
+    return meta
+
+
+def _write_atomically(path: Path, write) -> None:
+    """Write to a temporary file next to `path` and move it into place."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def _store_object(entry_dir: Path, bucket: str, key: str, response: dict) -> Path:
+    """Stream a `get_object` response into the cache entry and record its ETag."""
+    entry_dir.mkdir(parents=True, exist_ok=True)
+    etag = response["ETag"].strip('"')
+    filename = f"{etag}{_suffix(key)}"
+    _write_atomically(
+        entry_dir / filename,
+        lambda f: shutil.copyfileobj(response["Body"], f, length=8 * 1024**2),
+    )
+    meta = {"bucket": bucket, "key": key, "etag": etag, "filename": filename}
+    _write_atomically(
+        entry_dir / "meta.json", lambda f: f.write(json.dumps(meta).encode("utf-8"))
+    )
+    # Remove copies of previous versions of the object
+    for path in entry_dir.iterdir():
+        if path.name not in (filename, "meta.json") and not path.name.startswith("."):
+            path.unlink(missing_ok=True)
+    return entry_dir / filename
+
+
+def is_missing_object(error: Exception) -> bool:
+    """Whether an exception raised when fetching an S3 object means the object does not exist.
+
+    Args:
+        error (Exception): The exception raised by `fetch_object` or `cached_download_obj`.
+
+    Returns:
+        bool: True if the object is not in S3 (or not in the cache in offline mode).
+    """
+    if isinstance(error, FileNotFoundError):
+        return True
+    return isinstance(error, ClientError) and error.response["Error"]["Code"] in (
+        "NoSuchKey",
+        "404",
+    )
+
+
+def _touch(path: Path) -> Path:
+    """Mark a cached file as recently used for the LRU eviction."""
+    os.utime(path)
+    return path
+
+
+def evict_lru(
+    cache_dir: Path, max_size_bytes: int, keep: Optional[Path] = None
+) -> None:
+    """Remove the least recently used cached objects until the cache fits in `max_size_bytes`.
+
+    Args:
+        cache_dir (Path): The cache directory.
+        max_size_bytes (int): Maximum total size of the cached objects.
+        keep (Path, optional): A cached file that must not be evicted (e.g. the one just loaded).
+    """
+    cached_files = [
+        path
+        for path in cache_dir.glob("*/*/*")
+        if path.is_file() and path.name != "meta.json" and not path.name.startswith(".")
+    ]
+    stats = {path: path.stat() for path in cached_files}
+    total_size = sum(stat.st_size for stat in stats.values())
+    for path in sorted(cached_files, key=lambda p: stats[p].st_mtime):
+        if total_size <= max_size_bytes:
+            break
+        if keep is not None and path == keep:
+            continue
+        logger.info(f"Evicting {path.parent.name} from the S3 cache")
+        shutil.rmtree(path.parent, ignore_errors=True)
+        total_size -= stats[path].st_size
+
+
+def fetch_object(bucket: str, key: str, mode: Optional[str] = None) -> Path:
+    """Get a local path to s3://{bucket}/{key}, downloading it into the cache if needed.
+
+    Args:
+        bucket (str): The S3 bucket.
+        key (str): The full S3 key of the object.
+        mode (str, optional): Overrides the configured cache mode for this call.
+            One of "revalidate", "prefer_cache", "offline" or "off".
+
+    Raises:
+        FileNotFoundError: If the object is not cached and the cache is in offline mode.
+
+    Returns:
+        Path: Path to the local copy of the object. When the cache is "off" the file is
+            a temporary copy that the caller is responsible for deleting.
+    """
+    settings = get_cache_settings()
+    mode = mode or settings["mode"]
+    if mode not in CACHE_MODES:
+        raise ValueError(f"S3 cache mode must be one of {CACHE_MODES}, not '{mode}'.")
+
+    if mode == "off":
+        fd, tmp_name = tempfile.mkstemp(suffix=_suffix(key))
+        os.close(fd)
+        s3.download_file(bucket, key, tmp_name)
+        return Path(tmp_name)
+
+    entry_dir = _entry_dir(settings["directory"], bucket, key)
+    meta = _read_entry(entry_dir)
+
+    if meta is not None and mode in ("prefer_cache", "offline"):
+        return _touch(entry_dir / meta["filename"])
+    if meta is None and mode == "offline":
+        raise FileNotFoundError(
+            f"s3://{bucket}/{key} is not in the local cache and the cache is in offline mode."
+        )
+
+    get_kwargs = {"Bucket": bucket, "Key": key}
+    if meta is not None:
+        get_kwargs["IfNoneMatch"] = f'"{meta["etag"]}"'
+    try:
+        response = s3.get_object(**get_kwargs)
+    except ClientError as e:
+        if meta is not None and e.response["Error"]["Code"] in ("304", "NotModified"):
+            logger.debug(f"s3://{bucket}/{key} unchanged, serving from the cache")
+            return _touch(entry_dir / meta["filename"])
+        raise
+
+    logger.info(f"Downloading s3://{bucket}/{key} into the S3 cache")
+    path = _store_object(entry_dir, bucket, key, response)
+    evict_lru(settings["directory"], settings["max_size_bytes"], keep=path)
+    return path
+
+
+def read_local(path: Path, download_as: Optional[str] = None, **kwargs_reading) -> Any:
+    """Read a local copy of an S3 object, dispatching on its file suffix.
+
+    Args:
+        path (Path): Path to the local file.
+        download_as (str, optional): "dataframe", "dict" or "list". If None, the raw bytes are returned.
+        kwargs_reading: Keyword arguments passed to the reading function (e.g. pd.read_csv).
+
+    Returns:
+        Any: The content of the file.
+    """
+    suffix = path.suffix.lower()
+    if download_as is None:
+        return path.read_bytes()
+    if download_as == "dataframe":
+        if suffix == ".csv":
+            return pd.read_csv(path, **kwargs_reading)
+        if suffix == ".parquet":
+            return pd.read_parquet(path, **kwargs_reading)
+        if suffix in (".xlsx", ".xlsm"):
+            return pd.read_excel(path, **kwargs_reading)
+        if suffix == ".dta":
+            return pd.read_stata(path, **kwargs_reading)
+        if suffix == ".json":
+            return pd.read_json(path, **kwargs_reading)
+    if download_as in ("dict", "list") and suffix in (".json", ".geojson"):
+        with open(path, "rt") as f:
+            return json.load(f, **kwargs_reading)
+    raise ValueError(
+        f'Reading "{suffix}" files as "{download_as}" is not supported by the S3 cache.'
+    )
+
+
+def cached_download_obj(
+    bucket: str,
+    path_from: str,
+    download_as: Optional[str] = None,
+    kwargs_reading: Optional[dict] = None,
+    mode: Optional[str] = None,
+) -> Any:
+    """Drop-in replacement for nesta_ds_utils' `download_obj` that goes through the local S3 cache.
+
+    Args:
+        bucket (str): The S3 bucket.
+        path_from (str): The S3 key of the object.
+        download_as (str, optional): "dataframe", "dict" or "list". If None, the raw bytes are returned.
+        kwargs_reading (dict, optional): Keyword arguments passed to the reading function.
+        mode (str, optional): Overrides the configured cache mode for this call.
+
+    Returns:
+        Any: The content of the object.
+    """
+    path = fetch_object(bucket, path_from, mode=mode)
+    try:
+        return read_local(path, download_as, **(kwargs_reading or {}))
+    finally:
+        if (mode or get_cache_settings()["mode"]) == "off":
+            path.unlink(missing_ok=True)
@@ -0,0 +1,129 @@
+"""
+Handling of the counts suppressed for disclosure control in the CHPS tables.
+
+Small counts are published as a marker such as "<5" instead of a number. The counts are
+kept as nullable `Int64` columns, where the suppressed values are missing, plus a boolean
+`<column>_suppressed` mask column. The marker text is only rendered when a table is
+exported or shown (see `render_suppressed`), so the count columns never mix numbers and text.
+
+Usage:
+from afs_mission_goal.utils.suppression import split_suppressed, fill_suppressed, render_suppressed
+
+typed = split_suppressed(df)  # every count column parsed in one pass
+counts = fill_suppressed(typed, value=5)  # suppressed counts as 5, for calculations
+export = render_suppressed(typed, text="< 5")  # suppressed counts as text, for publishing
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Suffix of the boolean columns marking the suppressed values of a count column
+SUPPRESSED_SUFFIX = "_suppressed"
+
+# Markers of suppressed values, e.g. "<5" or "< 5"
+_SUPPRESSED_PATTERN = r"^<\s*\d+$"
+
+
+def count_columns(df: pd.DataFrame) -> pd.Index:
+    """The count columns of a table: the columns containing "number", without their suppression masks.
+
+    Args:
+        df (pd.DataFrame): The table.
+
+    Returns:
+        pd.Index: The names of the count columns.
+    """
+    columns = df.columns[df.columns.str.contains("number")]
+    return columns[~columns.str.endswith(SUPPRESSED_SUFFIX)]
+
+
+def mask_columns(df: pd.DataFrame) -> list:
+    """The suppression mask columns of a table."""
+    return [col for col in df.columns if col.endswith(SUPPRESSED_SUFFIX)]
+
+
+def split_suppressed(
+    df: pd.DataFrame, columns: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """Parse count columns into nullable integers plus a suppression mask for each.
+
+    All the columns are parsed together in one vectorised pass: the thousands separators
+    are removed with `str.replace`, the suppression markers are matched, and the rest
+    is converted with `pd.to_numeric`.
+
+    Args:
+        df (pd.DataFrame): The table, with counts as text (e.g. "1,200" or "<5") or numbers.
+        columns (Sequence[str], optional): The count columns. Defaults to every column containing "number".
+
+    Raises:
+        ValueError: If a count is neither a number nor a suppression marker.
+
+    Returns:
+        pd.DataFrame: The table with `Int64` counts, each followed by its `<column>_suppressed` mask.
+    """
+    columns = list(count_columns(df) if columns is None else columns)
+    if not columns:
+        return df
+    n_rows = len(df)
+    # Flatten the count columns into one series so they are parsed in one pass
+    values = pd.Series(
+        df[columns].to_numpy(dtype=object).ravel(order="F"), dtype="string"
+    )
+    values = values.str.replace(",", "", regex=False).str.strip()
+    suppressed = values.str.match(_SUPPRESSED_PATTERN).fillna(False).to_numpy(bool)
+    counts = pd.to_numeric(values.mask(suppressed)).astype("Int64").array
+    parsed = {}
+    for i, col in enumerate(columns):
+        rows = slice(i * n_rows, (i + 1) * n_rows)
+        parsed[col] = pd.Series(counts[rows], index=df.index)
+        parsed[col + SUPPRESSED_SUFFIX] = pd.Series(suppressed[rows], index=df.index)
+    df = df.assign(**parsed)
+    # Keep each mask next to its count column
+    order = []
+    for col in df.columns:
+        if col in parsed and col.endswith(SUPPRESSED_SUFFIX):
+            continue
+        order.append(col)
+        if col in columns:
+            order.append(col + SUPPRESSED_SUFFIX)
+    return df[order]
+
+
+def fill_suppressed(df: pd.DataFrame, value: int = 5) -> pd.DataFrame:
+    """Replace the suppressed counts by a value and drop the suppression masks.
+
+    Args:
+        df (pd.DataFrame): A table with counts and suppression masks (see `split_suppressed`).
+        value (int): The value of the suppressed counts. Defaults to 5.
+
+    Returns:
+        pd.DataFrame: The table with `Int64` counts and no masks.
+    """
+    masks = mask_columns(df)
+    filled = {}
+    for mask in masks:
+        col = mask[: -len(SUPPRESSED_SUFFIX)]
+        filled[col] = df[col].mask(df[mask], value)
+    return df.drop(columns=masks).assign(**filled)
+
+
+def render_suppressed(df: pd.DataFrame, text: str = "< 5") -> pd.DataFrame:
+    """Render the suppressed counts as text and drop the suppression masks, e.g. to export a table.
+
+    Args:
+        df (pd.DataFrame): A table with counts and suppression masks (see `split_suppressed`).
+        text (str): The text shown for the suppressed counts. Defaults to "< 5".
+
+    Returns:
+        pd.DataFrame: The table with the counts as text where they are suppressed.
+    """
+    masks = mask_columns(df)
+    rendered = {}
+    for mask in masks:
+        col = mask[: -len(SUPPRESSED_SUFFIX)]
+        rendered[col] = pd.Series(
+            np.where(df[mask], text, df[col].astype(object)), index=df.index
+        )
+    return df.drop(columns=masks).assign(**rendered)
@@ -0,0 +1,286 @@
+"""
+Survey-weighted estimates from the FRS, by any grouping, in one grouped pass.
+
+The rows are coded once by their group, and every weighted total, mean, proportion
+and quantile is computed from those codes with `np.bincount` (totals and means) or
+one sort per column (quantiles), instead of a groupby per statistic.
+
+The variance of the estimates is estimated with a Poisson bootstrap: each replicate
+multiplies the weight of every household by an independent Poisson(1) draw, so the
+replicates need no resampling of rows. The replicates are spread across processes.
+
+The FRS grossing weight of the households is set in `config["survey_weights"]`.
+
+Usage:
+from afs_mission_goal.utils.weighted_estimates import weighted_estimates, bootstrap_estimates, get_weighted_base_df
+from afs_mission_goal.getters.uk_data_service.misc.get_frs_dictionary_index import get_frs_clean_labels
+
+df = get_weighted_base_df()
+weight = get_frs_clean_labels()["GROSS4"]
+weighted_estimates(df, weight, by=["num_adults"], totals=["num_children"], quantiles={"hh_total_household_income": [0.5]})
+bootstrap_estimates(df, weight, by=["num_adults"], means=["hh_total_household_income"], replicates=200)
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from afs_mission_goal import DS_BUCKET, config
+from afs_mission_goal.getters.uk_data_service.processed.family_resources_filtered import (
+    get_base_df,
+)
+from afs_mission_goal.getters.uk_data_service.misc.get_frs_dictionary_index import (
+    get_frs_clean_labels,
+)
+from afs_mission_goal.utils.household_aggregation import align_to_households
+from afs_mission_goal.utils.parquet_storage import read_processed_table
+
+logger = logging.getLogger(__name__)
+
+_weights_config = config.get("survey_weights", {})
+
+
+def group_codes(df: pd.DataFrame, by: Optional[Sequence[str]]) -> tuple:
+    """Code the rows of a table by their group.
+
+    Args:
+        df (pd.DataFrame): The table.
+        by (Sequence[str], optional): The columns to group by. If None, every row is in one group.
+
+    Returns:
+        tuple: The group of every row (-1 where a grouping value is missing), and the groups as a pd.Index.
+    """
+    if not by:
+        return np.zeros(len(df), dtype=np.int64), pd.Index(["all"], name="group")
+    # Only the observed groups, so the codes and the groups match for categorical columns
+    grouped = df.groupby(list(by), sort=True, dropna=True, observed=True)
+    codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    return codes, grouped.size().index
+
+
+def _weighted_quantiles(
+    values: np.ndarray,
+    weights: np.ndarray,
+    codes: np.ndarray,
+    n_groups: int,
+    probabilities: Sequence[float],
+) -> Dict[float, np.ndarray]:
+    """Weighted quantiles of every group: the smallest value with at least this share of the group's weight at or below it."""
+    keep = (codes >= 0) & ~np.isnan(values) & ~np.isnan(weights)
+    values, weights, codes = values[keep], weights[keep], codes[keep]
+    quantiles = {q: np.full(n_groups, np.nan) for q in probabilities}
+    if not len(values):
+        return quantiles
+    order = np.lexsort((values, codes))
+    values, weights, codes = values[order], weights[order], codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    groups = codes[starts]
+    cumulative = np.cumsum(weights)
+    # Cumulative weight within each group
+    before_group = np.repeat(
+        cumulative[starts] - weights[starts], np.diff(np.r_[starts, len(values)])
+    )
+    cumulative -= before_group
+    totals = np.bincount(codes, weights, minlength=n_groups)
+    positions = np.arange(len(values))
+    for q in probabilities:
+        reached = cumulative >= q * totals[codes] - 1e-12 * totals[codes]
+        first = np.minimum.reduceat(np.where(reached, positions, len(values)), starts)
+        quantiles[q][groups] = values[np.minimum(first, len(values) - 1)]
+    return quantiles
+
+
+def weighted_estimates(
+    df: pd.DataFrame,
+    weight: str,
+    by: Optional[Sequence[str]] = None,
+    totals: Sequence[str] = (),
+    means: Sequence[str] = (),
+    proportions: Sequence[str] = (),
+    quantiles: Optional[Dict[str, Sequence[float]]] = None,
+    weights: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """Compute weighted totals, means, proportions and quantiles by group, in one grouped pass.
+
+    Rows with a missing value are left out of the statistics of that column only, and rows
+    without a weight are left out of every statistic.
+
+    Args:
+        df (pd.DataFrame): The table, e.g. the base dataframe with the household weights.
+        weight (str): The column of the survey weights.
+        by (Sequence[str], optional): The columns to group by. Defaults to the whole table.
+        totals (Sequence[str]): The columns to sum, e.g. ["num_children"].
+        means (Sequence[str]): The columns to average.
+        proportions (Sequence[str]): The boolean columns of which to estimate the share of True values.
+        quantiles (Dict[str, Sequence[float]], optional): The quantiles of each column, e.g. {"hh_total_household_income": [0.5]}.
+        weights (np.ndarray, optional): Weights to use instead of the `weight` column, e.g. replicate weights.
+
+    Returns:
+        pd.DataFrame: One row per group, with the weighted and unweighted number of rows, then the columns
+            "total_<column>", "mean_<column>", "proportion_<column>" and "q<quantile>_<column>" (e.g. "q0.5_income").
+    """
+    codes, groups = group_codes(df, by)
+    n_groups = len(groups)
+    weights = df[weight].to_numpy(dtype="float64") if weights is None else weights
+    in_group = codes >= 0
+    # The rows without a weight are left out of every estimate, including the counts
+    weighted = in_group & ~np.isnan(weights)
+    estimates = {
+        "weighted_count": np.bincount(
+            codes[weighted], weights[weighted], minlength=n_groups
+        ),
+        "unweighted_count": np.bincount(codes[weighted], minlength=n_groups),
+    }
+    for prefix, columns in [
+        ("total", totals),
+        ("mean", means),
+        ("proportion", proportions),
+    ]:
+        for col in columns:
+            values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            keep = in_group & ~np.isnan(values) & ~np.isnan(weights)
+            weighted_sum = np.bincount(
+                codes[keep], weights[keep] * values[keep], minlength=n_groups
+            )
+            if prefix == "total":
+                estimates[f"total_{col}"] = weighted_sum
+            else:
+                weight_sum = np.bincount(codes[keep], weights[keep], minlength=n_groups)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    estimates[f"{prefix}_{col}"] = weighted_sum / weight_sum
+    for col, probabilities in (quantiles or {}).items():
+        values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        for q, result in _weighted_quantiles(
+            values, weights, codes, n_groups, probabilities
+        ).items():
+            estimates[f"q{q}_{col}"] = result
+    return pd.DataFrame(estimates, index=groups)
+
+
+def _replicate_estimates(
+    df: pd.DataFrame,
+    weight: str,
+    clusters: np.ndarray,
+    n_clusters: int,
+    seed: np.random.SeedSequence,
+    replicates: int,
+    kwargs: dict,
+) -> List[pd.DataFrame]:
+    """Compute the estimates of a batch of Poisson bootstrap replicates (run in a worker process)."""
+    rng = np.random.default_rng(seed)
+    weights = df[weight].to_numpy(dtype="float64")
+    estimates = []
+    for _ in range(replicates):
+        multipliers = rng.poisson(1.0, n_clusters)[clusters]
+        estimates.append(
+            weighted_estimates(df, weight, weights=weights * multipliers, **kwargs)
+        )
+    return estimates
+
+
+def bootstrap_estimates(
+    df: pd.DataFrame,
+    weight: str,
+    by: Optional[Sequence[str]] = None,
+    totals: Sequence[str] = (),
+    means: Sequence[str] = (),
+    proportions: Sequence[str] = (),
+    quantiles: Optional[Dict[str, Sequence[float]]] = None,
+    cluster: str = "sernum",
+    replicates: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Compute weighted estimates (see `weighted_estimates`) with Poisson bootstrap standard errors.
+
+    Each replicate draws one Poisson(1) multiplier per cluster (the household by default), so
+    people of the same household are resampled together. The replicates are computed in
+    `max_workers` processes, and the results are reproducible for a given `seed`.
+
+    Args:
+        df (pd.DataFrame): The table.
+        weight (str): The column of the survey weights.
+        by, totals, means, proportions, quantiles: The estimates to compute (see `weighted_estimates`).
+        cluster (str): The column of the resampled units. Defaults to "sernum".
+        replicates (int, optional): The number of bootstrap replicates.
+            Defaults to `config["survey_weights"]["bootstrap_replicates"]`.
+        max_workers (int, optional): The number of processes. Defaults to the number of CPUs.
+        seed (int): The seed of the replicates. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The estimates, each followed by its standard error in a "se_<estimate>" column.
+    """
+    replicates = replicates or _weights_config.get("bootstrap_replicates", 200)
+    kwargs = dict(
+        by=by, totals=totals, means=means, proportions=proportions, quantiles=quantiles
+    )
+    estimates = weighted_estimates(df, weight, **kwargs)
+    clusters, cluster_values = pd.factorize(df[cluster])
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        n_batches = min(max_workers, replicates)
+        batch_sizes = np.diff(np.linspace(0, replicates, n_batches + 1).astype(int))
+        seeds = np.random.SeedSequence(seed).spawn(n_batches)
+        futures = [
+            executor.submit(
+                _replicate_estimates,
+                df,
+                weight,
+                clusters,
+                len(cluster_values),
+                batch_seed,
+                int(size),
+                kwargs,
+            )
+            for batch_seed, size in zip(seeds, batch_sizes)
+        ]
+        replicate_estimates = [
+            estimate for future in futures for estimate in future.result()
+        ]
+    stacked = np.stack([estimate.to_numpy() for estimate in replicate_estimates])
+    standard_errors = pd.DataFrame(
+        np.nanstd(stacked, axis=0, ddof=1),
+        index=estimates.index,
+        columns=[f"se_{col}" for col in estimates.columns],
+    )
+    logger.info(f"Computed {replicates} bootstrap replicates")
+    columns = [
+        col
+        for estimate in estimates.columns
+        if estimate != "unweighted_count"
+        for col in (estimate, f"se_{estimate}")
+    ]
+    return estimates.join(standard_errors)[["unweighted_count"] + columns]
+
+
+def get_weighted_base_df(weight_column: Optional[str] = None) -> pd.DataFrame:
+    """Load the base dataframe with the grossing weight of each household.
+
+    Args:
+        weight_column (str, optional): The column of the grossing weight in the filtered household dataframe.
+            Defaults to the cleaned label (see `get_frs_clean_labels`) of the FRS variable
+            `config["survey_weights"]["household_weight"]`.
+
+    Returns:
+        pd.DataFrame: The base dataframe (see `get_base_df`) with the weight column.
+    """
+    if weight_column is None:
+        variable = _weights_config["household_weight"].upper()
+        weight_column = get_frs_clean_labels()[variable]
+    base_df = get_base_df()
+    # Only the weights of the filtered household dataframe (see `get_filtered_datasets`) are needed
+    household = read_processed_table(
+        DS_BUCKET,
+        "data/processed/filtered_dataframes/household_df.csv",
+        columns=["sernum", weight_column],
+    )
+    weights = align_to_households(
+        pd.Index(base_df.sernum, name="sernum"),
+        household.drop_duplicates(),
+        fill_value=np.nan,
+    )
+    return base_df.assign(**{weight_column: weights[weight_column].to_numpy()})